@@ -0,0 +1,263 @@
+# Import libraries
+import time
+import random
+import hashlib
+from array import array
+
+from tools import apply_pattern, load_word_index, rank_candidates, np, GameState, WordIndex
+
+
+# Define constants
+# Transposition tables with more entries are cleared
+MAX_TABLE_SIZE: int = 200000
+
+
+# Classes
+class EvilHangman:
+    """
+    An adversary for the impossible mode that never commits to a word.
+
+    It keeps every word that is still consistent with the game and answers each guess with the reveal pattern that
+    keeps the most of them (the largest family), so every guess costs one pass over the remaining candidates.
+    """
+
+    def __init__(self, wordlist: str | WordIndex,
+                 length: int | None = None) -> None:
+        """
+        :param wordlist: Path to the wordlist or a loaded word index.
+        :param length: Length of the word. Defaults to the most common word length.
+        :raises ValueError: If the wordlist has no words of the length.
+        """
+
+        index = load_word_index(wordlist)
+        if length is None:
+            length = max(index.bucket_sizes, key=index.bucket_sizes.get)
+        elif not index.bucket_sizes.get(length):
+            raise ValueError(f'The wordlist has no words of length {length}.')
+
+        self.state = GameState(index, length)
+
+    def __len__(self) -> int:
+        return len(self.state)
+
+    @property
+    def progress_word(self) -> str:
+        return self.state.progress_word
+
+    @property
+    def wrong_guessed(self) -> list[str]:
+        return self.state.wrong_guessed
+
+    def choose_pattern(self, letter: str) -> int:
+        """
+        Returns the pattern the adversary answers a letter with.
+
+        :param letter: The guessed letter.
+        :return: Bitmask of the positions to reveal, 0 for a miss.
+        """
+
+        return self.get_largest_family(self.state.bucket.get_partitions(self.state.candidate_rows, [letter])[letter])
+
+    @staticmethod
+    def get_largest_family(partition: dict[int, int]) -> int:
+        """
+        Returns the pattern of the largest family of a partition.
+
+        :param partition: The number of candidates per pattern.
+        :return: Bitmask of the positions to reveal, 0 for a miss.
+        """
+
+        # The largest family wins, ties go to a miss and then to the pattern that reveals the fewest positions
+        return max(partition, key=lambda pattern: (partition[pattern], pattern == 0, -pattern.bit_count()))
+
+    def guess(self, letter: str) -> bool:
+        """
+        Answers a guess and keeps only the words of the chosen family.
+
+        :param letter: The guessed letter.
+        :return: True if the letter was revealed, False if it was a miss.
+        """
+
+        if letter in self.state.guessed_letters:
+            return letter in self.progress_word
+
+        pattern = self.choose_pattern(letter)
+        self.state.apply_guess(letter, apply_pattern(self.progress_word, letter, pattern))
+        return pattern != 0
+
+    def get_word(self) -> str:
+        """
+        Returns one of the remaining words, e.g. to reveal it when the player lost.
+
+        :return: A random word that is consistent with the game.
+        """
+
+        rows = self.state.candidate_rows
+        return self.state.bucket.get_words([rows[random.randrange(len(rows))]])[0]
+
+
+class _SearchTimeout(Exception):
+    """
+    Raised when a search exceeds the time budget of a move.
+    """
+
+
+class LookaheadHangman(EvilHangman):
+    """
+    An adversary that searches some guesses ahead instead of only keeping the largest family.
+
+    The guesser is assumed to play like the bot: it guesses one of the best letters of the bot's method. For every
+    pattern the adversary could answer with, the search plays the following guesses out with a depth-limited minimax
+    (the adversary maximizes the misses, the guesser minimizes them) and answers with the pattern that leaves the most
+    misses. Positions are stored in a transposition table keyed by a fingerprint of the candidate set, and the search
+    deepens iteratively until the time budget of the move is used up.
+    """
+
+    def __init__(self, wordlist: str | WordIndex,
+                 length: int | None = None,
+                 depth: int = 2,
+                 time_budget: float = 1.0,
+                 method: int = 1,
+                 breadth: int = 1) -> None:
+        """
+        :param wordlist: Path to the wordlist or a loaded word index.
+        :param length: Length of the word. Defaults to the most common word length.
+        :param depth: Number of guesses to search ahead.
+        :param time_budget: Seconds one move may take. The deepest completed search is used.
+        :param method: Method of the modelled guesser (1: letter frequency, 2: information, 3: positional letter
+                       frequency).
+        :param breadth: Number of the guesser's best letters that are searched at every guess.
+        """
+
+        super().__init__(wordlist, length)
+        self.depth = depth
+        self.time_budget = time_budget
+        self.method = method
+        self.breadth = breadth
+        # Value of a searched position, keyed by the fingerprint of the position and the remaining depth
+        self.table: dict[tuple[bytes, int], tuple[int, int]] = {}
+        self.deadline = 0.0
+
+    def get_fingerprint(self, rows: 'list[int] | range | np.ndarray',
+                        guessed_letters: list[str]) -> bytes:
+        """
+        Returns the fingerprint of a position: the candidate set and the letters the guesser can't guess anymore.
+
+        :param rows: Rows of the candidates in the bucket.
+        :param guessed_letters: The already guessed letters.
+        :return: A digest of the position.
+        """
+
+        if np is not None and isinstance(rows, np.ndarray):
+            data = rows.astype(np.uint32).tobytes()
+        else:
+            data = array('I', rows).tobytes()
+
+        digest = hashlib.blake2b(data, digest_size=16)
+        digest.update(''.join(sorted(set(guessed_letters))).encode('utf-8'))
+        return digest.digest()
+
+    def search(self, progress_word: str,
+               wrong_guessed: list[str],
+               rows: 'list[int] | range | np.ndarray',
+               depth: int) -> tuple[int, int]:
+        """
+        Returns the value of a position where the guesser is to move.
+
+        :param progress_word: The progress word of the position.
+        :param wrong_guessed: The wrong guessed letters of the position.
+        :param rows: Rows of the candidates in the bucket.
+        :param depth: Number of guesses left to search.
+        :return: The number of misses the adversary can still force and the number of candidates left after them.
+        """
+
+        if time.perf_counter() > self.deadline:
+            raise _SearchTimeout
+
+        if depth == 0 or len(rows) <= 1:
+            return 0, len(rows)
+
+        guessed_letters = list(set(char for char in progress_word if char != '_')) + wrong_guessed
+        key = (self.get_fingerprint(rows, guessed_letters), depth)
+        if key in self.table:
+            return self.table[key]
+
+        ranking = rank_candidates(self.state.bucket, rows, guessed_letters, self.method)
+        value = None
+        for letter, _ in ranking[:self.breadth]:
+            letter_value = self.search_guess(progress_word, wrong_guessed, rows, letter, depth)[1]
+            if value is None or letter_value < value:
+                value = letter_value
+
+        if value is None:
+            value = (0, len(rows))
+
+        if len(self.table) >= MAX_TABLE_SIZE:
+            self.table.clear()
+
+        self.table[key] = value
+        return value
+
+    def search_guess(self, progress_word: str,
+                     wrong_guessed: list[str],
+                     rows: 'list[int] | range | np.ndarray',
+                     letter: str,
+                     depth: int,
+                     partition: dict[int, int] | None = None) -> tuple[int, tuple[int, int]]:
+        """
+        Returns the best answer of the adversary to a guess and its value.
+
+        :param progress_word: The progress word before the guess.
+        :param wrong_guessed: The wrong guessed letters before the guess.
+        :param rows: Rows of the candidates in the bucket.
+        :param letter: The guessed letter.
+        :param depth: Number of guesses left to search, including this one.
+        :param partition: The number of candidates per pattern of the letter, if it is already known.
+        :return: The pattern to answer with and the value of the position after it.
+        """
+
+        bucket = self.state.bucket
+        best_pattern, best_value = 0, None
+        if partition is None:
+            partition = bucket.get_partitions(rows, [letter])[letter]
+
+        for pattern in partition:
+            if time.perf_counter() > self.deadline:
+                raise _SearchTimeout
+
+            if pattern == 0:
+                next_progress_word, next_wrong_guessed = progress_word, wrong_guessed + [letter]
+            else:
+                next_progress_word, next_wrong_guessed = apply_pattern(progress_word, letter, pattern), wrong_guessed
+
+            next_rows = bucket.filter(next_progress_word, next_wrong_guessed, rows)
+            misses, size = self.search(next_progress_word, next_wrong_guessed, next_rows, depth - 1)
+            value = (misses + (pattern == 0), size)
+            if best_value is None or value > best_value:
+                best_pattern, best_value = pattern, value
+
+        return best_pattern, best_value
+
+    def choose_pattern(self, letter: str) -> int:
+        """
+        Returns the pattern of the deepest search that finished within the time budget. If not even the first search
+        finished, the largest family is kept. The clock is checked before every answer the search tries, so a move
+        overruns the budget by at most one filter and one analysis, or by the partition of the candidates itself if
+        that alone takes longer than the budget.
+
+        :param letter: The guessed letter.
+        :return: Bitmask of the positions to reveal, 0 for a miss.
+        """
+
+        # The budget starts before the partition of the candidates, which every search reuses
+        self.deadline = time.perf_counter() + self.time_budget
+        rows = self.state.candidate_rows
+        partition = self.state.bucket.get_partitions(rows, [letter])[letter]
+        pattern = self.get_largest_family(partition)
+        for depth in range(1, self.depth + 1):
+            try:
+                pattern = self.search_guess(self.progress_word, self.wrong_guessed, rows, letter, depth, partition)[0]
+            except _SearchTimeout:
+                break
+
+        return pattern
@@ -0,0 +1,175 @@
+# Import libraries
+import os
+import atexit
+import shelve
+from collections import OrderedDict
+
+from instrumentation import count
+from tools import get_state_key, get_strategy, load_word_index, Strategy, WordIndex
+
+
+# Define constants
+EVICTION_POLICIES: list[str] = ['lru', 'fifo']
+# Part of every key, so an on-disk tier with results of an older format isn't read
+CACHE_VERSION: int = 2
+
+
+class AnalysisCache:
+    """
+    A bounded cache of word analysis results, keyed by the wordlist, the method and the canonical game state.
+    A result is the number of candidates and the letter ranking. The candidates themselves aren't kept, they can be
+    filtered again with a LazyWordList when they are needed.
+
+    Results can additionally be kept in an on-disk tier (a shelve database), so repeated runs can start warm.
+    """
+
+    def __init__(self, max_size: int = 1024,
+                 eviction: str = 'lru',
+                 disk_path: str | None = None) -> None:
+        """
+        :param max_size: Maximum number of results kept in memory.
+        :param eviction: 'lru' evicts the least recently used result, 'fifo' the oldest one.
+        :param disk_path: Optional path of the on-disk tier.
+        """
+
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f'Unknown eviction policy {eviction}. Choose one of {", ".join(EVICTION_POLICIES)}.')
+
+        self.max_size = max_size
+        self.eviction = eviction
+        self.entries: OrderedDict[str, tuple[int, list[list[str, int | float]]]] = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.disk = None
+        if disk_path is not None:
+            self.disk = shelve.open(disk_path)
+            atexit.register(self.close)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries or (self.disk is not None and key in self.disk)
+
+    @staticmethod
+    def get_key(d_progress_word: str,
+                d_wrong_guessed: list[str],
+                wordlist: str | WordIndex,
+                method: str | int | Strategy = 1) -> str:
+        """
+        Returns the cache key of a state. It contains the modification time and the size of the wordlist file, so
+        results of a wordlist that was changed in place (e.g. cleaned again) aren't read from the on-disk tier.
+
+        :param d_progress_word: The word with the already guessed letters and underscores as not-guessed letters.
+        :param d_wrong_guessed: A list of all wrong guessed letters.
+        :param wordlist: The path to the wordlist or a loaded word index.
+        :param method: Name or number of a registered strategy.
+        :return: The cache key.
+        """
+
+        wordlist_path = load_word_index(wordlist).wordlist_path
+        stat = os.stat(wordlist_path)
+        # The name of the strategy, so its name and its number share the results
+        method = get_strategy(method).name
+        return f'{CACHE_VERSION}|{os.path.abspath(wordlist_path)}|{stat.st_mtime_ns}|{stat.st_size}|{method}|' \
+               f'{get_state_key(d_progress_word, d_wrong_guessed)}'
+
+    def get(self, key: str) -> tuple[int, list[list[str, int | float]]] | None:
+        """
+        Returns a cached result and updates the counters.
+
+        :param key: The cache key.
+        :return: The number of candidates and the letter ranking, or None if they aren't cached.
+        """
+
+        if key in self.entries:
+            self.hits += 1
+            count('analysis_cache_hits')
+            if self.eviction == 'lru':
+                self.entries.move_to_end(key)
+
+            return self.entries[key]
+
+        if self.disk is not None and key in self.disk:
+            self.disk_hits += 1
+            count('analysis_cache_disk_hits')
+            result = self.disk[key]
+            self._store(key, result)
+            return result
+
+        self.misses += 1
+        count('analysis_cache_misses')
+        return None
+
+    def put(self, key: str,
+            result: tuple[int, list[list[str, int | float]]]) -> None:
+        """
+        Caches a result in memory and, if enabled, on disk.
+
+        :param key: The cache key.
+        :param result: The number of candidates and the letter ranking.
+        :return: None
+        """
+
+        self._store(key, result)
+        if self.disk is not None:
+            self.disk[key] = result
+
+    def _store(self, key: str,
+               result: tuple[int, list[list[str, int | float]]]) -> None:
+        """
+        Caches a result in memory and evicts results if the cache is full.
+
+        :param key: The cache key.
+        :param result: The number of candidates and the letter ranking.
+        :return: None
+        """
+
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Removes all results from memory and resets the counters. The on-disk tier is kept.
+
+        :return: None
+        """
+
+        self.entries.clear()
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+    def close(self) -> None:
+        """
+        Closes the on-disk tier.
+
+        :return: None
+        """
+
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+            atexit.unregister(self.close)
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        Returns the counters of the cache.
+
+        :return: Size, hits, disk hits, misses, evictions and the hit rate.
+        """
+
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
@@ -0,0 +1,140 @@
+# Import libraries
+import os
+import mmap
+import atexit
+import tempfile
+from collections import Counter
+from multiprocessing import Pool, cpu_count
+
+from instrumentation import instrument
+from tools import count_patterns, count_patterns_numpy, load_word_index, np, WordIndex
+
+
+# Define constants
+# Candidate sets smaller than this are faster to analyze in the calling process
+POOL_MIN_CANDIDATES: int = 20000
+
+# Memory-mapped letter codes and bucket layout of a worker process
+_codes: mmap.mmap | None = None
+_layout: dict[int, tuple[int, int]] = {}
+
+
+def _init_worker(codes_path: str,
+                 layout: dict[int, tuple[int, int]]) -> None:
+    """
+    Initializes a worker process by memory-mapping the letter codes of the word index.
+
+    :param codes_path: Path to the file with the letter codes of all buckets.
+    :param layout: Offset and number of words of each bucket, keyed by the word length.
+    :return: None
+    """
+
+    global _codes, _layout
+    with open(codes_path, 'rb') as file:
+        _codes = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    _layout = layout
+
+
+def _partition_task(args: tuple[int, list[int] | range, list[int]]) -> dict[int, dict[int, int]]:
+    """
+    Counts the reveal patterns of a slice of candidates in a worker process.
+
+    :param args: The word length, the rows of the candidates and the letter codes.
+    :return: For each letter code, the number of words per pattern.
+    """
+
+    length, rows, codes = args
+    offset, count = _layout[length]
+    if np is not None:
+        matrix = np.frombuffer(_codes, dtype=np.uint8, count=count * length, offset=offset).reshape(count, length)
+        return count_patterns_numpy(matrix[np.asarray(rows, dtype=np.intp)], codes)
+
+    return count_patterns((_codes[offset + row * length:offset + (row + 1) * length] for row in rows), codes)
+
+
+class AnalysisPool:
+    """
+    A long-lived pool of worker processes for the word analysis.
+
+    The letter codes of every bucket are written once to a file that all workers memory-map (or, for compiled
+    wordlists, the workers map the wordlist itself), so a task only carries the rows of its candidates instead of
+    the words themselves.
+    """
+
+    def __init__(self, wordlist: str | WordIndex,
+                 processes: int | None = None,
+                 chunk_size: int = 10000,
+                 min_candidates: int = POOL_MIN_CANDIDATES) -> None:
+        self.index = load_word_index(wordlist)
+        self.chunk_size = chunk_size
+        self.min_candidates = min_candidates
+
+        layout: dict[int, tuple[int, int]] = {}
+        if self.index.is_compiled:
+            # Compiled wordlists already contain the letter codes, so the workers can map them directly
+            self.codes_path = self.index.wordlist_path
+            self.owns_codes_file = False
+            for length, (count, codes_offset, _) in self.index.layout.items():
+                layout[length] = (codes_offset, count)
+        else:
+            # Write the letter codes of all buckets into one file
+            file_descriptor, self.codes_path = tempfile.mkstemp(prefix='hangman_', suffix='.codes')
+            self.owns_codes_file = True
+            with os.fdopen(file_descriptor, 'wb') as file:
+                for length in sorted(self.index.bucket_sizes):
+                    bucket = self.index.get_encoded_bucket(length)
+                    layout[length] = (file.tell(), len(bucket))
+                    file.write(bucket.codes)
+
+        self.pool = Pool(processes or cpu_count(), initializer=_init_worker, initargs=(self.codes_path, layout))
+        atexit.register(self.close)
+
+    def __enter__(self) -> 'AnalysisPool':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Stops the worker processes and removes the letter codes file.
+
+        :return: None
+        """
+
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+            if self.owns_codes_file:
+                os.remove(self.codes_path)
+            atexit.unregister(self.close)
+
+    @instrument('pool_dispatch')
+    def get_partitions(self, length: int,
+                       rows: 'list[int] | range | np.ndarray',
+                       letters: list[str]) -> dict[str, dict[int, int]]:
+        """
+        Groups the given words by the pattern each letter would reveal in them, like WordBucket.get_partitions.
+        The rows are split into chunks that are counted in the worker processes.
+
+        :param length: Length of the words.
+        :param rows: Rows of the words in the bucket of that length.
+        :param letters: The letters to group the words by.
+        :return: For each letter, the number of words per pattern.
+        """
+
+        letter_codes = self.index.letter_codes
+        codes = [letter_codes[letter] for letter in letters if letter in letter_codes]
+        chunks = [(length, rows[i:i + self.chunk_size], codes) for i in range(0, len(rows), self.chunk_size)]
+
+        # Sum up the pattern counts of all chunks
+        patterns: dict[int, Counter] = {code: Counter() for code in codes}
+        for chunk_patterns in self.pool.imap_unordered(_partition_task, chunks):
+            for code, partition in chunk_patterns.items():
+                patterns[code].update(partition)
+
+        # Letters outside the alphabet are in none of the words
+        return {letter: dict(patterns[letter_codes[letter]]) if letter in letter_codes else {0: len(rows)}
+                for letter in letters}
@@ -0,0 +1,431 @@
+# Import libraries
+import os
+import gc
+import sys
+import json
+import random
+import platform
+import tempfile
+from time import perf_counter
+from collections import Counter
+from multiprocessing import get_context
+from typing import Any, Callable, Sequence
+from rich import print
+from rich.table import Table
+from rich.console import Console
+from rich.traceback import install
+
+from bot import get_commit, play_word
+from tools import get_most_common_letters, get_percentile, get_possible_words, get_word_analysis_meth1, \
+    get_word_analysis_meth2, find_wordlist, txt2list, ALPHABET, BACKENDS, np, WordIndex, WORDFILE_EXTENSION
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, the peak memory isn't reported there
+    resource = None
+
+
+install()
+cs = Console()
+
+# Define constants
+BUNDLED_WORDLISTS: list[str] = ['Wordlists/wordlist_english.txt', 'Wordlists/wordlist_german.txt']
+# Numbers of words of the synthetic wordlists, larger ones (up to 10M) can be given with -s
+SYNTHETIC_SIZES: list[int] = [10000, 100000, 1000000]
+BENCHMARKS: list[str] = ['txt2list', 'get_possible_words', 'get_most_common_letters', 'get_word_analysis_meth1',
+                         'get_word_analysis_meth2', 'full_games']
+# Number of times a whole wordlist is read by txt2list
+FILE_REPEATS: int = 10
+# Words that are generated at once for a synthetic wordlist
+GENERATE_CHUNK_SIZE: int = 100000
+# A benchmark regresses if its throughput or its median latency is this much worse than in the baseline
+DEFAULT_TOLERANCE: float = 0.25
+
+
+# Functions
+def get_peak_rss() -> float | None:
+    """
+    Returns the peak resident memory of the process so far. Every benchmark runs in its own process, so this is the
+    peak of one benchmark, including the interpreter and the loaded index.
+
+    :return: The peak memory in MiB, or None if it can't be measured on this platform.
+    """
+
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def generate_wordlist(size: int,
+                      seed: int = 0,
+                      model_path: str = BUNDLED_WORDLISTS[0]) -> str:
+    """
+    Generates a synthetic wordlist whose word lengths and letters follow the distribution of a model wordlist.
+    The list is written in chunks, so even 10M words don't have to fit into memory at once, and it is reused by later
+    runs with the same size and seed.
+
+    :param size: Number of words.
+    :param seed: Seed of the generator.
+    :param model_path: Path to the wordlist whose distributions are used.
+    :return: Path to the wordlist in the temporary directory.
+    """
+
+    path = os.path.join(tempfile.gettempdir(), f'hangman_synthetic_{size}_{seed}.txt')
+    if os.path.exists(path):
+        return path
+
+    words = txt2list(model_path)
+    length_counts = Counter(len(word) for word in words)
+    letter_counts = Counter(char for word in words for char in word if char in ALPHABET)
+    lengths, length_weights = list(length_counts), list(length_counts.values())
+    letters, letter_weights = list(letter_counts), list(letter_counts.values())
+
+    rng = random.Random(seed)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        for start in range(0, size, GENERATE_CHUNK_SIZE):
+            word_lengths = rng.choices(lengths, length_weights, k=min(GENERATE_CHUNK_SIZE, size - start))
+            chars = ''.join(rng.choices(letters, letter_weights, k=sum(word_lengths)))
+            offset = 0
+            lines = []
+            for length in word_lengths:
+                lines.append(chars[offset:offset + length])
+                offset += length
+
+            file.write('\n'.join(lines) + '\n')
+
+    os.replace(temp_path, path)
+    return path
+
+
+def get_states(index: WordIndex,
+               count: int,
+               seed: int = 0) -> list[tuple[str, list[str], str]]:
+    """
+    Returns reproducible game states of random words: some of their letters are revealed and up to three letters that
+    aren't in the word are wrong guessed.
+
+    :param index: The word index.
+    :param count: Number of states.
+    :param seed: Seed of the random states.
+    :return: The progress word, the wrong guessed letters and the word of each state.
+    """
+
+    rng = random.Random(seed)
+    states = []
+    # Sorted, so the states don't depend on the order of the words in a compiled wordlist
+    for word in rng.sample(sorted(index.words), min(count, len(index))):
+        letters = sorted(set(word))
+        revealed = set(rng.sample(letters, rng.randrange(len(letters))))
+        progress_word = ''.join(char if char in revealed else '_' for char in word)
+        wrong_guessed = rng.sample([letter for letter in ALPHABET if letter not in letters], rng.randint(0, 3))
+        states.append((progress_word, wrong_guessed, word))
+
+    return states
+
+
+def load_index(wordlist_path: str,
+               backend: str = 'python') -> WordIndex:
+    """
+    Loads a word index and encodes all of its buckets, so the benchmarks don't pay for the first use of a word length.
+
+    :param wordlist_path: Path to the wordlist.
+    :param backend: Backend of the word index.
+    :return: The word index.
+    """
+
+    index = WordIndex(wordlist_path, backend)
+    for length in index.bucket_sizes:
+        index.get_encoded_bucket(length)
+
+    return index
+
+
+def run_benchmark(operation: Callable[[Any], Any],
+                  inputs: Sequence,
+                  max_time: float,
+                  prepare: Callable[[Any], Any] | None = None) -> dict[str, float | int]:
+    """
+    Times an operation on each input, until all inputs are done or the time is up.
+
+    :param operation: The operation.
+    :param inputs: The inputs, one per operation.
+    :param max_time: Seconds after which no further operation is started.
+    :param prepare: Optional function that turns an input into the argument of the operation, outside the timing.
+    :return: The number of operations, the operations per second and the 50th, 95th and 99th percentile latencies in
+             milliseconds.
+    """
+
+    # Like timeit, without garbage collection pauses in the middle of an operation
+    gc.collect()
+    gc.disable()
+    latencies = []
+    start_time = perf_counter()
+    try:
+        for item in inputs:
+            argument = prepare(item) if prepare is not None else item
+            start = perf_counter()
+            operation(argument)
+            latencies.append(perf_counter() - start)
+            if perf_counter() - start_time > max_time:
+                break
+    finally:
+        gc.enable()
+
+    total_time = sum(latencies)
+    return {
+        'ops': len(latencies),
+        'ops_per_second': len(latencies) / total_time if total_time else 0.0,
+        'p50_ms': get_percentile(latencies, 50) * 1000,
+        'p95_ms': get_percentile(latencies, 95) * 1000,
+        'p99_ms': get_percentile(latencies, 99) * 1000
+    }
+
+
+def run_isolated_benchmark(wordlist_path: str,
+                           index_path: str,
+                           name: str,
+                           benchmark: str,
+                           ops: int = 200,
+                           max_time: float = 10.0,
+                           seed: int = 0,
+                           backend: str = 'python') -> dict[str, str | float | int | None]:
+    """
+    Runs one benchmark on a freshly loaded index. It is run in its own process, so no benchmark profits from what an
+    earlier one cached and the peak memory belongs to this benchmark alone.
+
+    :param wordlist_path: Path to the text wordlist, which txt2list reads.
+    :param index_path: Path to the wordlist the index is loaded from, e.g. its compiled version.
+    :param name: Name of the wordlist in the results.
+    :param benchmark: Name of the benchmark.
+    :param ops: Number of states or games.
+    :param max_time: Seconds after which the benchmark stops starting new operations.
+    :param seed: Seed of the states and games.
+    :param backend: Backend of the word index.
+    :return: The results of the benchmark and the peak memory of the process in MiB.
+    """
+
+    if benchmark == 'txt2list':
+        result = run_benchmark(txt2list, [wordlist_path] * FILE_REPEATS, max_time)
+        return {'wordlist': name, 'benchmark': benchmark, **result, 'peak_rss_mb': get_peak_rss()}
+
+    index = load_index(index_path, backend)
+    states = get_states(index, ops, seed)
+    # Games share the memo of the decisions in the first states, like the test of the bot
+    decisions = {}
+    operations = {
+        'get_possible_words': lambda: run_benchmark(lambda state: get_possible_words(state[0], state[1], index),
+                                                    states, max_time),
+        'get_most_common_letters': lambda: run_benchmark(
+            lambda state: get_most_common_letters(*state), states, max_time,
+            prepare=lambda state: (get_possible_words(state[0], state[1], index),
+                                   list(set(state[0]) - {'_'}) + state[1])),
+        'get_word_analysis_meth1': lambda: run_benchmark(
+            lambda state: get_word_analysis_meth1(state[0], state[1], index), states, max_time),
+        'get_word_analysis_meth2': lambda: run_benchmark(
+            lambda state: get_word_analysis_meth2(state[0], state[1], index), states, max_time),
+        'full_games': lambda: run_benchmark(lambda state: play_word(state[2], index, decisions=decisions), states,
+                                            max_time)
+    }
+
+    return {'wordlist': name, 'benchmark': benchmark, **operations[benchmark](), 'peak_rss_mb': get_peak_rss()}
+
+
+def benchmark_wordlist(wordlist_path: str,
+                       name: str,
+                       benchmarks: list[str],
+                       ops: int = 200,
+                       max_time: float = 10.0,
+                       seed: int = 0,
+                       backend: str = 'python') -> list[dict[str, str | float | int | None]]:
+    """
+    Runs the benchmarks on one wordlist, each in a new process.
+
+    :param wordlist_path: Path to the text wordlist. The index is loaded from its compiled version, if it exists.
+    :param name: Name of the wordlist in the results.
+    :param benchmarks: Names of the benchmarks to run.
+    :param ops: Number of states or games per benchmark.
+    :param max_time: Seconds after which a benchmark stops starting new operations.
+    :param seed: Seed of the states and games.
+    :param backend: Backend of the word index.
+    :return: One row per benchmark.
+    """
+
+    index_path = find_wordlist(wordlist_path)
+    # Spawned instead of forked, so the process doesn't start with the memory of this one
+    context = get_context('spawn')
+    rows = []
+    for benchmark in benchmarks:
+        print(f'Running [cyan]{benchmark}[/cyan] on [cyan]{name}[/cyan]...')
+        with context.Pool(1) as pool:
+            rows.append(pool.apply(run_isolated_benchmark, (wordlist_path, index_path, name, benchmark, ops, max_time,
+                                                             seed, backend)))
+
+    return rows
+
+
+def compare_results(rows: list[dict[str, str | float | int | None]],
+                    baseline: list[dict[str, str | float | int | None]],
+                    tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """
+    Compares results with a baseline and adds the change of the throughput to every row that is in the baseline.
+
+    :param rows: The results.
+    :param baseline: The results of an earlier run.
+    :param tolerance: Allowed relative loss of throughput or increase of the median latency or the peak memory. The
+                      tail percentiles are reported, but too noisy to fail on.
+    :return: A description of every regression.
+    """
+
+    baseline_rows = {(row['wordlist'], row['benchmark']): row for row in baseline}
+    regressions = []
+    for row in rows:
+        base = baseline_rows.get((row['wordlist'], row['benchmark']))
+        if base is None or not base['ops_per_second']:
+            continue
+
+        row['change'] = row['ops_per_second'] / base['ops_per_second'] - 1
+        if row['ops_per_second'] < base['ops_per_second'] * (1 - tolerance):
+            regressions.append(f'{row["benchmark"]} on {row["wordlist"]}: {row["ops_per_second"]:.1f} ops/sec '
+                               f'instead of {base["ops_per_second"]:.1f}')
+        elif row['p50_ms'] > base['p50_ms'] * (1 + tolerance):
+            regressions.append(f'{row["benchmark"]} on {row["wordlist"]}: median of {row["p50_ms"]:.3f} ms '
+                               f'instead of {base["p50_ms"]:.3f} ms')
+        elif row['peak_rss_mb'] is not None and base.get('peak_rss_mb') is not None \
+                and row['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f'{row["benchmark"]} on {row["wordlist"]}: peak memory of {row["peak_rss_mb"]:.0f} MiB '
+                               f'instead of {base["peak_rss_mb"]:.0f} MiB')
+
+    return regressions
+
+
+def print_results(rows: list[dict[str, str | float | int | None]]) -> None:
+    """
+    Prints the results as a table.
+
+    :param rows: The results.
+    :return: None
+    """
+
+    results_table = Table(title='[magenta]Benchmarks')
+    results_table.add_column('Wordlist', justify='center', style='cyan')
+    results_table.add_column('Benchmark', justify='center', style='cyan')
+    results_table.add_column('Ops', justify='center', style='green')
+    results_table.add_column('Ops/sec', justify='center', style='green')
+    results_table.add_column('p50', justify='center', style='magenta')
+    results_table.add_column('p95', justify='center', style='magenta')
+    results_table.add_column('p99', justify='center', style='magenta')
+    results_table.add_column('Peak RSS', justify='center', style='green')
+    results_table.add_column('Change', justify='center', style='cyan')
+    for row in rows:
+        peak = f'{row["peak_rss_mb"]:.0f} MiB' if row['peak_rss_mb'] is not None else '-'
+        change = f'{row["change"] * 100:+.1f}%' if 'change' in row else '-'
+        results_table.add_row(row['wordlist'], row['benchmark'], str(row['ops']), f'{row["ops_per_second"]:.1f}',
+                              f'{row["p50_ms"]:.3f} ms', f'{row["p95_ms"]:.3f} ms', f'{row["p99_ms"]:.3f} ms', peak,
+                              change)
+
+    cs.print(results_table)
+
+
+def start_dialog(args: list[str]) -> None:
+    """
+    Runs the benchmarks with the options given on the command line.
+
+    :param args: Command line arguments
+    :type args: list[str]
+    :return:
+    :rtype: None
+    """
+
+    if '-h' in args:
+        print('Usage: python3 benchmark.py [-w wordlist-path ...] [-s sizes] [-k benchmarks] [-n ops] [-t seconds] '
+              '[-r seed] [-b backend] [-o output-path] [-c baseline-path] [-tol tolerance]')
+        print('[bright_green]Options:')
+        print('[cyan]-w:[/cyan] Wordlist to benchmark, can be given more than once (default: English and German)')
+        print(f'[cyan]-s:[/cyan] Comma-separated sizes of synthetic wordlists, 0 for none '
+              f'(default: {",".join(map(str, SYNTHETIC_SIZES))})')
+        print(f'[cyan]-k:[/cyan] Comma-separated benchmarks (default: {",".join(BENCHMARKS)})')
+        print('[cyan]-n:[/cyan] Number of states or games per benchmark (default: 200)')
+        print('[cyan]-t:[/cyan] Seconds after which a benchmark stops (default: 10)')
+        print('[cyan]-r:[/cyan] Seed of the states, games and synthetic wordlists (default: 0)')
+        print('[cyan]-b:[/cyan] Backend for the word analysis (python/numpy)')
+        print('[cyan]-o:[/cyan] Save the results as JSON, e.g. as a baseline')
+        print('[cyan]-c:[/cyan] Compare with a baseline and fail on regressions')
+        print(f'[cyan]-tol:[/cyan] Allowed relative regression (default: {DEFAULT_TOLERANCE})')
+        quit()
+
+    wordlists = [args[i + 1] for i, arg in enumerate(args[:-1]) if arg == '-w'] or BUNDLED_WORDLISTS
+    sizes = [int(size) for size in args[args.index('-s') + 1].split(',')] if '-s' in args else SYNTHETIC_SIZES
+    benchmarks = args[args.index('-k') + 1].split(',') if '-k' in args else BENCHMARKS
+    ops = int(args[args.index('-n') + 1]) if '-n' in args else 200
+    max_time = float(args[args.index('-t') + 1]) if '-t' in args else 10.0
+    seed = int(args[args.index('-r') + 1]) if '-r' in args else 0
+    backend = args[args.index('-b') + 1] if '-b' in args else 'python'
+    output = args[args.index('-o') + 1] if '-o' in args else None
+    baseline_path = args[args.index('-c') + 1] if '-c' in args else None
+    tolerance = float(args[args.index('-tol') + 1]) if '-tol' in args else DEFAULT_TOLERANCE
+    for wordlist in wordlists:
+        if not os.path.exists(wordlist):
+            print(f'[italic red]Wordlist {wordlist} not found.')
+            quit()
+        elif wordlist.endswith(WORDFILE_EXTENSION):
+            print(f'[italic red]Give the text version of {wordlist}, its compiled version is used if it is up to date.')
+            quit()
+
+    if any(benchmark not in BENCHMARKS for benchmark in benchmarks):
+        print('[italic red]Benchmark not supported.')
+        quit()
+    elif backend not in BACKENDS:
+        print('[italic red]Backend not supported.')
+        quit()
+    elif backend == 'numpy' and np is None:
+        print('[italic red]The numpy backend requires numpy to be installed.')
+        quit()
+    elif baseline_path is not None and not os.path.exists(baseline_path):
+        print('[italic red]Baseline not found.')
+        quit()
+
+    baseline = None
+    if baseline_path is not None:
+        with open(baseline_path, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+
+        # Other states or another backend give numbers that can't be compared
+        if (baseline['meta']['seed'], baseline['meta']['backend'], baseline['meta']['ops']) != (seed, backend, ops):
+            print('[italic red]The baseline was measured with another seed, backend or number of operations, '
+                  'run the benchmarks with the same options.')
+            sys.exit(1)
+
+    targets = [(wordlist, os.path.basename(wordlist)) for wordlist in wordlists]
+    for size in sizes:
+        if size > 0:
+            print(f'Generating a synthetic wordlist with [cyan]{size}[/cyan] words...')
+            targets.append((generate_wordlist(size, seed), f'synthetic-{size}'))
+
+    rows = []
+    for wordlist_path, name in targets:
+        rows += benchmark_wordlist(wordlist_path, name, benchmarks, ops, max_time, seed, backend)
+
+    regressions = compare_results(rows, baseline['results'], tolerance) if baseline is not None else []
+
+    print_results(rows)
+    if output is not None:
+        meta = {'commit': get_commit(), 'python': platform.python_version(), 'platform': platform.platform(),
+                'backend': backend, 'seed': seed, 'ops': ops}
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump({'meta': meta, 'results': rows}, file, indent=4)
+        print(f'Saved the results to [cyan]{output}[/cyan].')
+
+    if regressions:
+        print('[bold red]Performance regressions:')
+        for regression in regressions:
+            print(f'[red]- {regression}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    start_dialog(sys.argv)
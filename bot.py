@@ -1,28 +1,57 @@
 import os; os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 import sys
+import csv
 import json
+import math
 import time
+import random
 import pygame
+import subprocess
 from rich import print
 from rich.table import Table
 from rich.console import Console
+from rich.progress import Progress
 from rich.traceback import install
-from tools import get_word_analysis_meth1, txt2list, get_word_analysis_meth2
+from collections import deque, OrderedDict
+from multiprocessing import Pool, cpu_count
+import instrumentation
+from game import MAX_WRONG_GUESSES, GameEngine
+from analysis_pool import AnalysisPool
+from analysis_cache import AnalysisCache
+from openings import find_opening_book, OpeningBook
+from simulation import simulate_batch
+from live_data import LiveDataPublisher, LiveDataSubscriber
+from tools import check_letters, get_average, get_percentile, get_new_progress_word, get_strategy, find_wordlist, \
+    load_word_index, np, GameState, LazyWordList, STRATEGIES, Strategy, WordIndex
 
 
 install()
 cs = Console()
 
-
-def check_keyboard() -> None:
+# States with at least this many candidates are memoized while testing
+MEMO_MIN_CANDIDATES: int = 50
+# Default frame cap of the visualization
+DEFAULT_FPS: int = 30
+# Number of rendered texts the visualization keeps, the least recently used ones are rendered again when needed
+MAX_RENDERED_TEXTS: int = 256
+# Number of points of the win rate series of a strategy in the comparison chart
+COMPARISON_HISTORY: int = 200
+# Share of the remaining distance the bars of the comparison chart move per second
+ANIMATION_SPEED: float = 6.0
+# Event type of the letter rankings the visualization receives from the bot
+LIVE_DATA_EVENT: int = pygame.USEREVENT + 1
+
+
+def check_keyboard(events: list[pygame.event.Event] | None = None) -> None:
     """
     Checks for keyboard events and quits the game if the escape key is pressed.
 
+    :param events: Events to check, defaults to the pending events of pygame.
     :return:
     :rtype: None
     """
 
-    for event in pygame.event.get():
+    for event in (events if events is not None else pygame.event.get()):
         if event.type == pygame.QUIT:
             pygame.quit()
             quit()
@@ -33,51 +62,143 @@ def check_keyboard() -> None:
                 quit()
 
 
-def analyze_and_update(progress_word: str,
-                       wrong_guessed: list[str],
-                       word: str,
-                       wordlist_path: str) -> tuple[str, str]:
+def play_word(word: str,
+              wordlist: str | WordIndex,
+              max_wrong_guesses: int = MAX_WRONG_GUESSES,
+              decisions: dict[tuple[str, frozenset[str]], str] | None = None,
+              book: OpeningBook | None = None,
+              strategy: str | int | Strategy = 1) -> tuple[bool, int]:
     """
-    Analyzes possible words and updates the progress word based on a guessed letter.
-
-    :param wordlist_path: Path to the wordlist
-    :param progress_word: The word with the already guessed letters and underscores as not-guessed letters.
-    :param wrong_guessed: A list of all wrong guessed letters.
-    :param word: The word to guess
+    Lets the bot play a game against the given word until it is solved or the bot is hanged.
+
+    :param word: The word to guess.
+    :param wordlist: Path to the wordlist or a loaded word index.
+    :param max_wrong_guesses: Number of wrong guesses the bot may make without losing.
+    :param decisions: Optional memo of the letters chosen in states with many candidates. These states are shared by
+                      most games of the same word length, so the memo can be reused across games.
+    :param book: Optional opening book of the strategy for the wordlist.
+    :param strategy: Name or number of a registered strategy.
     :return:
-        - next_letter: The most frequent letter from possible remaining words.
-        - updated_progress_word: The updated progress word with the guessed letter inserted if valid.
+        - won: True if the bot solved the word.
+        - wrong_guesses: The number of wrong guesses.
+    """
+
+    state = GameState(wordlist, len(word))
+    while state.progress_word != word and len(state.wrong_guessed) <= max_wrong_guesses:
+        key = (state.progress_word, frozenset(state.wrong_guessed))
+        opening = book.lookup(state.progress_word, state.wrong_guessed) if book is not None else None
+        if opening is not None:
+            next_letter = opening[1][0][0]
+        elif decisions is not None and key in decisions:
+            next_letter = decisions[key]
+        else:
+            ranking = state.analyze(strategy)[1]
+            next_letter = ranking[0][0]
+            if decisions is not None and len(state) >= MEMO_MIN_CANDIDATES:
+                decisions[key] = next_letter
+
+        state.apply_guess(next_letter, get_new_progress_word(state.progress_word, next_letter, word))
+
+    return state.progress_word == word, len(state.wrong_guessed)
+
+
+# Word index, strategy, miss budget and opening book of a test worker process
+_test_index: WordIndex | None = None
+_test_strategy: str = 'frequency'
+_test_max_wrong_guesses: int = MAX_WRONG_GUESSES
+_test_book: OpeningBook | None = None
+
+
+def _init_test_worker(wordlist_path: str,
+                      backend: str,
+                      strategy: str,
+                      max_wrong_guesses: int,
+                      book: OpeningBook | None) -> None:
+    """
+    Initializes a test worker process. With fork the index is inherited from the parent instead of being loaded again.
+
+    :param wordlist_path: Path to the wordlist.
+    :param backend: The backend of the word index.
+    :param strategy: Name of a registered strategy.
+    :param max_wrong_guesses: Number of wrong guesses the bot may make without losing.
+    :param book: Optional opening book of the strategy.
+    :return: None
+    """
+
+    global _test_index, _test_strategy, _test_max_wrong_guesses, _test_book
+    _test_index = load_word_index(wordlist_path, backend)
+    _test_strategy = strategy
+    _test_max_wrong_guesses = max_wrong_guesses
+    _test_book = book
+
+
+def _test_shard(words: list[str]) -> tuple[int, int, int]:
+    """
+    Plays every word of a shard in a test worker process.
+
+    :param words: The words of the shard.
+    :return: The number of games, the number of won games and the total number of wrong guesses.
+    """
+
+    results = simulate_batch(words, _test_index, _test_strategy, _test_max_wrong_guesses, _test_book)
+    return len(words), sum(won for won, _ in results), sum(wrong for _, wrong in results)
+
+
+def get_commit() -> str | None:
+    """
+    Returns the current git commit, so benchmark results can be compared across commits.
+
+    :return: The short commit hash, or None outside a git repository.
+    """
+
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_benchmark_results(rows: list[dict[str, str | int | float | None]],
+                            path: str) -> None:
+    """
+    Writes benchmark results as JSON, or as CSV if the path ends with .csv.
+
+    :param rows: The results, one dictionary per row.
+    :param path: Path of the results file.
+    :return: None
     """
 
-    words = txt2list(wordlist_path)  # Read wordlist only once (outside the loop)
-
-    # Get already guessed letters and lowercase words (pre-processing)
-    guessed_letters = set(char for char in progress_word if char != '_')
-    possible_words = [w.lower() for w in words if len(w) == len(progress_word)]
-
-    # Filter possible words based on progress and wrong guesses
-    filtered_words = [w for w in possible_words
-                      if not any(letter in w for letter in wrong_guessed)
-                      and all(w[i] == guessed_letters.pop() if p != '_' else True for i, p in enumerate(progress_word))]
-
-    # Get the most common letter from the remaining words
-    letter_counts = {}
-    for w in filtered_words:
-        for ch in w:
-            letter_counts[ch] = letter_counts.get(ch, 0) + 1
-    next_letter = max(letter_counts, key=letter_counts.get)
-
-    # Update progress_word if the letter is present
-    updated_progress_word = ""
-    for i, char in enumerate(word):
-        if char == next_letter:
-            updated_progress_word += next_letter
-        elif progress_word[i] == '_':
-            updated_progress_word += '_'
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        if path.endswith('.csv'):
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]) if rows else [])
+            writer.writeheader()
+            writer.writerows(rows)
         else:
-            updated_progress_word += progress_word[i]
+            json.dump(rows, file, indent=4, ensure_ascii=False)
 
-    return next_letter, updated_progress_word
+
+def print_comparison(rows: list[dict[str, str | int | float | None]]) -> None:
+    """
+    Prints the results of Bot.method_comparison as a table.
+
+    :param rows: The results, one dictionary per strategy.
+    :return: None
+    """
+
+    comparison_table = Table(title='[magenta]Strategy comparison')
+    comparison_table.add_column('Strategy', justify='center', style='cyan')
+    comparison_table.add_column('Wordlist', justify='center', style='cyan')
+    comparison_table.add_column('Win rate', justify='center', style='green')
+    comparison_table.add_column('Mean wrong guesses', justify='center', style='magenta')
+    comparison_table.add_column('P95 wrong guesses', justify='center', style='magenta')
+    comparison_table.add_column('Decision latency', justify='center', style='green')
+    comparison_table.add_column('Games/sec', justify='center', style='cyan')
+    for row in rows:
+        comparison_table.add_row(row['strategy'], row['wordlist'], f'{row["win_rate"] * 100:.2f}%',
+                                 f'{row["mean_wrong_guesses"]:.2f}', str(row['p95_wrong_guesses']),
+                                 f'{row["mean_decision_ms"]:.2f} ms', f'{row["games_per_second"]:.1f}')
+
+    cs.print(comparison_table)
 
 
 # Classes
@@ -86,11 +207,29 @@ class Visualisation:
     Visualizes data in a bar chart with pygame.
     """
 
-    def __init__(self):
+    def __init__(self, fps: int = DEFAULT_FPS):
+        """
+        :param fps: Maximum number of frames per second.
+        """
+
         pygame.init()
         self.screen = pygame.display.set_mode((1000, 500), pygame.RESIZABLE)
         pygame.display.set_caption('Occurrences')
         self.clock = pygame.time.Clock()
+        self.fps = fps
+        # Fonts keyed by their file (None for the system font) and size, and rendered texts keyed by text and font.
+        # The texts are bounded, since the status of a comparison changes with every update
+        self.fonts: dict[tuple[str | None, int], pygame.font.Font] = {}
+        self.texts: OrderedDict[tuple[str, str | None, int, str | tuple[int, int, int]], pygame.Surface] = \
+            OrderedDict()
+        # Layout of the last frame and the label and bar height of each of its columns, to only redraw what changed
+        self.layout: tuple | None = None
+        self.columns: list[tuple[str, float]] = []
+        # Progress of the strategies of a running comparison, keyed by the wordlist and the strategy, with a bounded
+        # series of the cumulative win rate and the shares of the games per number of wrong guesses
+        self.comparison: dict[tuple[str, str], dict] = {}
+        # Shares of the miss distributions as currently shown, which are animated towards the published ones
+        self.shown_misses: dict[tuple[str, str], list[float]] = {}
         self.colors = [
             (255, 87, 51),
             (52, 152, 219),
@@ -123,12 +262,43 @@ class Visualisation:
             (142, 68, 173)
         ]
 
+    def render_text(self, text: str,
+                    size: int,
+                    font_path: str | None = None,
+                    color: str | tuple[int, int, int] = 'white') -> pygame.Surface:
+        """
+        Renders a text, reusing the fonts and the rendered texts of earlier frames.
+
+        :param text: The text.
+        :param size: The font size.
+        :param font_path: Path to a font file, None for the system font.
+        :param color: The color of the text.
+        :return: The rendered text.
+        """
+
+        key = (text, font_path, size, color)
+        if key in self.texts:
+            self.texts.move_to_end(key)
+            return self.texts[key]
+
+        if (font_path, size) not in self.fonts:
+            self.fonts[font_path, size] = pygame.font.Font(font_path, size) if font_path is not None else \
+                pygame.font.SysFont('arial', size)
+
+        self.texts[key] = self.fonts[font_path, size].render(text, True, color)
+        if len(self.texts) > MAX_RENDERED_TEXTS:
+            self.texts.popitem(last=False)
+
+        return self.texts[key]
+
+    @instrumentation.instrument('render')
     def draw_bar_chart(self,
                        labels: list[str],
                        values: list[int],
-                       gap_size: int | float = 20) -> None:
+                       gap_size: int | float = 20) -> list[pygame.Rect]:
         """
-        Draws a bar chart with the given labels and values.
+        Draws a bar chart with the given labels and values. If the layout is the same as in the last frame, only the
+        columns whose label or bar changed are redrawn.
 
         :param labels:
         :type labels: List[str]
@@ -136,67 +306,208 @@ class Visualisation:
         :type values: List[int]
         :param gap_size: Gap size between the bars
         :type gap_size: int | float
-        :return:
-        :rtype: None
+        :return: The areas of the screen that changed.
+        :rtype: list[pygame.Rect]
         """
 
-        bar_width: float = (self.screen.get_width() - (gap_size * 2) - ((len(labels) - 1) * gap_size)) / (len(labels))
-        font = pygame.font.SysFont('arial', int(bar_width * 0.9))
+        width, height = self.screen.get_size()
+        bar_width: float = (width - (gap_size * 2) - ((len(labels) - 1) * gap_size)) / (len(labels))
         value_limit: float = max(values) * 1.2
-        x: int = gap_size
-        for i in range(len(labels)):
-            y = self.screen.get_height() * (values[i] / value_limit)
-            pygame.draw.rect(self.screen, self.colors[i],
-                             [x, self.screen.get_height() - y, bar_width, y])
-            text = font.render(labels[i], True, 'white')
-            self.screen.blit(text, (x + ((bar_width - text.get_width()) / 2),
-                                    self.screen.get_height() - y - (text.get_height() * 0.9)))
+        columns = [(label, height * (value / value_limit)) for label, value in zip(labels, values)]
+        layout = (width, height, len(labels), gap_size)
+        if layout != self.layout:
+            self.screen.fill('black')
+            self.layout = layout
+            self.columns = [None] * len(columns)
+            full_redraw = True
+        else:
+            full_redraw = False
+
+        dirty = []
+
+        x: float = gap_size
+        for i, (label, y) in enumerate(columns):
+            if columns[i] != self.columns[i]:
+                # Each column owns its bar and half of the gaps next to it
+                column = pygame.Rect(int(x - gap_size / 2), 0, int(bar_width + gap_size) + 1, height)
+                self.screen.fill('black', column)
+                self.screen.set_clip(column)
+                pygame.draw.rect(self.screen, self.colors[i % len(self.colors)], [x, height - y, bar_width, y])
+                text = self.render_text(label, int(bar_width * 0.9))
+                self.screen.blit(text, (x + ((bar_width - text.get_width()) / 2),
+                                        height - y - (text.get_height() * 0.9)))
+                self.screen.set_clip(None)
+                dirty.append(column)
+
             x += bar_width + gap_size
 
-    def run(self, searching_intervall: int | float = 3) -> None:
+        self.columns = columns
+        return [self.screen.get_rect()] if full_redraw else dirty
+
+    @instrumentation.instrument('render')
+    def draw_no_data(self) -> list[pygame.Rect]:
+        """
+        Draws the message that there is no data, unless it is already shown.
+
+        :return: The areas of the screen that changed.
+        """
+
+        layout = (*self.screen.get_size(), 'no data')
+        if layout == self.layout:
+            return []
+
+        self.layout = layout
+        self.screen.fill('black')
+        text = self.render_text('No data available.', int((self.screen.get_width() / 18) + 100), './Neoteric-32A8.ttf')
+        self.screen.blit(text, ((self.screen.get_width() - text.get_width()) / 2,
+                                (self.screen.get_height() - text.get_height()) / 2))
+        return [self.screen.get_rect()]
+
+    def update_comparison(self, data: dict) -> None:
+        """
+        Adds the progress of a strategy that Bot.method_comparison published.
+
+        :param data: The wordlist, the strategy, the number of played games and of all games, the cumulative win rate
+                     and the number of games per number of wrong guesses.
+        :return: None
+        """
+
+        key = (data['wordlist'], data['strategy'])
+        entry = self.comparison.get(key)
+        if entry is None or data['games'] < entry['games']:
+            # A new comparison started
+            entry = self.comparison[key] = {'series': deque(maxlen=COMPARISON_HISTORY)}
+
+        entry['series'].append((data['games'] / data['total'], data['win_rate']))
+        entry['games'] = data['games']
+        entry['total'] = data['total']
+        entry['win_rate'] = data['win_rate']
+        entry['misses'] = [count / data['games'] for count in data['misses']]
+
+    @instrumentation.instrument('render')
+    def draw_comparison(self, margin: int = 40) -> bool:
         """
-        Main loop for the visualization.
+        Draws the cumulative win rate of every strategy over the progress of the comparison and their distributions
+        of wrong guesses. The bars of the distributions move a step towards their latest values per frame.
+
+        :param margin: Margin around the charts.
+        :return: True if the bars haven't reached their latest values yet.
+        """
+
+        width, height = self.screen.get_size()
+        self.screen.fill('black')
+        win_chart = pygame.Rect(margin, margin, width / 2 - margin * 1.5, height - margin * 2)
+        miss_chart = pygame.Rect(width / 2 + margin / 2, margin, width / 2 - margin * 1.5, height - margin * 2)
+        for chart, title in ((win_chart, 'Win rate'), (miss_chart, 'Wrong guesses')):
+            pygame.draw.rect(self.screen, (80, 80, 80), chart, 1)
+            text = self.render_text(title, 20)
+            self.screen.blit(text, (chart.centerx - text.get_width() / 2, chart.top - text.get_height() - 5))
+
+        # The win rate axis starts at the next lower tenth of the lowest win rate
+        lowest = min(min(win_rate for _, win_rate in entry['series']) for entry in self.comparison.values())
+        low = min(math.floor(lowest * 10) / 10, 0.9)
+        for value in (low, 1):
+            text = self.render_text(f'{value * 100:.0f}%', 14)
+            self.screen.blit(text, (win_chart.left - text.get_width() - 5,
+                                    win_chart.bottom - (value - low) / (1 - low) * win_chart.height
+                                    - text.get_height() / 2))
+
+        step = min(1.0, ANIMATION_SPEED / self.fps)
+        animating = False
+        bins = max(len(entry['misses']) for entry in self.comparison.values())
+        group_width = miss_chart.width / bins
+        bar_width = group_width * 0.8 / len(self.comparison)
+        highest = max(max(entry['misses']) for entry in self.comparison.values()) * 1.1
+        for i, (key, entry) in enumerate(self.comparison.items()):
+            color = self.colors[i % len(self.colors)]
+            points = [(win_chart.left + progress * win_chart.width,
+                       win_chart.bottom - (win_rate - low) / (1 - low) * win_chart.height)
+                      for progress, win_rate in entry['series']]
+            if len(points) > 1:
+                pygame.draw.lines(self.screen, color, False, points, 2)
+            pygame.draw.circle(self.screen, color, points[-1], 4)
+
+            legend = self.render_text(f'{key[1]} ({key[0]})', 16, color=color)
+            self.screen.blit(legend, (win_chart.left + 10, win_chart.top + 10 + i * 40))
+            played = entry['games'] / entry['total']
+            status = self.render_text(f'{entry["win_rate"] * 100:.1f}% after {played * 100:.0f}% of the words', 14)
+            self.screen.blit(status, (win_chart.left + 10, win_chart.top + 28 + i * 40))
+
+            shown = self.shown_misses.setdefault(key, [0.0] * len(entry['misses']))
+            for k, share in enumerate(entry['misses']):
+                shown[k] += (share - shown[k]) * step
+                animating = animating or abs(share - shown[k]) > 0.001
+                bar_height = shown[k] / highest * miss_chart.height
+                bar_x = miss_chart.left + k * group_width + group_width * 0.1 + i * bar_width
+                pygame.draw.rect(self.screen, color, [bar_x, miss_chart.bottom - bar_height, bar_width, bar_height])
+
+        for k in range(bins):
+            text = self.render_text(str(k) if k < bins - 1 else 'lost', 14)
+            self.screen.blit(text, (miss_chart.left + (k + 0.5) * group_width - text.get_width() / 2,
+                                    miss_chart.bottom + 5))
+
+        return animating
+
+    def run(self) -> None:
+        """
+        Main loop for the visualization. It sleeps until the bot publishes a new letter ranking or the progress of a
+        strategy comparison (see LiveDataPublisher) or the window changes, and only redraws then, at most fps times per
+        second. While the bars of a comparison move, it keeps drawing.
 
-        :param searching_intervall: Time intervall to search for new data
-        :type searching_intervall: int | float
         :return:
         :rtype: None
         """
 
+        # The subscriber thread hands the updates to the main loop as pygame events
+        LiveDataSubscriber(lambda seq, kind, data: pygame.event.post(
+            pygame.event.Event(LIVE_DATA_EVENT, seq=seq, kind=kind, data=data)))
         labels = []
         values = []
+        kind = 'letters'
+        redraw = True
+        animating = False
         while True:
-            check_keyboard()
-            self.screen.fill('black')
-
-            if int(time.time()) % searching_intervall == 0:
-                try:
-                    with open('live_data.json', 'r') as file:
-                        json_obj = json.load(file)
-
-                    labels = list(json_obj.keys())
-                    values = list(json_obj.values())
-
-                except json.JSONDecodeError:
-                    labels = []
-                    values = []
-
+            events = pygame.event.get() if redraw or animating else [pygame.event.wait()] + pygame.event.get()
+            check_keyboard(events)
+            for event in events:
+                if event.type == LIVE_DATA_EVENT:
+                    if event.kind != kind:
+                        kind = event.kind
+                        self.layout = None
+
+                    if kind == 'comparison':
+                        self.update_comparison(event.data)
+                    else:
+                        labels = [letter for letter, _ in event.data]
+                        values = [value for _, value in event.data]
+
+                    redraw = True
+                elif event.type in (pygame.VIDEORESIZE, pygame.WINDOWEXPOSED):
+                    # The texts of the old size won't be needed again
+                    self.texts.clear()
+                    self.layout = None
+                    redraw = True
+
+            if not redraw and not animating:
+                continue
+
+            redraw = False
+            if kind == 'comparison':
+                animating = self.draw_comparison()
+                pygame.display.flip()
+                self.clock.tick(self.fps)
+                continue
+
+            animating = False
             if 0 in values:
                 first_idx = values.index(0)
                 values = values[:first_idx]
                 labels = labels[:first_idx]
 
-            if not labels:
-                font = pygame.font.Font('./Neoteric-32A8.ttf',
-                                        int((self.screen.get_width() / 18) + 100))
-                text = font.render('No data available.', True, 'white')
-                self.screen.blit(text, ((self.screen.get_width() - text.get_width()) / 2,
-                                        (self.screen.get_height() - text.get_height()) / 2))
-            else:
-                self.draw_bar_chart(labels, values)
-
-            pygame.display.flip()
-            self.clock.tick()
+            dirty = self.draw_bar_chart(labels, values) if labels else self.draw_no_data()
+            if dirty:
+                pygame.display.update(dirty)
+                self.clock.tick(self.fps)
 
 
 class Bot:
@@ -204,8 +515,62 @@ class Bot:
     A bot that can guess words based on the progress and wrong guessed letters.
     """
 
-    def __init__(self, wordlist_path: str) -> None:
-        self.wordlist_path = wordlist_path
+    def __init__(self, wordlist: str | WordIndex,
+                 backend: str = 'python',
+                 processes: int = 1,
+                 book: OpeningBook | None = None,
+                 cache: AnalysisCache | None = None) -> None:
+        self.index = load_word_index(wordlist, backend)
+        self.wordlist_path = self.index.wordlist_path
+        # Precomputed letter rankings for the first guesses
+        self.book = book
+        # Results of states that were already analyzed
+        self.cache = cache
+        # Remaining candidates of the current game, narrowed with every guess
+        self.state: GameState | None = None
+        # Worker processes for the information of large candidate sets, started once per bot
+        self.pool: AnalysisPool | None = AnalysisPool(self.index, processes) if processes > 1 else None
+
+    def analyze(self, d_progress_word: str,
+                wrong_guessed: list[str],
+                method: str | int | Strategy = 1) -> tuple[list[str], list[list[str, int | float]]]:
+        """
+        Returns a list of possible words left and a list of letters ranked by a strategy, e.g. with their frequency
+        (method 1) or their information in bits (method 2).
+        Consecutive states of the same game only filter the candidates left from the previous state.
+
+        :param d_progress_word: The word with the already guessed letters and underscores as not-guessed letters.
+        :param wrong_guessed: A list of all wrong guessed letters.
+        :param method: Name or number of a registered strategy.
+        :return:
+        :raises ValueError: If a wrong guessed letter has more than one character.
+        """
+
+        # Checked before the opening book and the cache are looked up, which key the state by its letters
+        wrong_guessed = check_letters(wrong_guessed)
+        if self.state is None:
+            self.state = GameState(self.index, len(d_progress_word))
+
+        self.state.update(d_progress_word, wrong_guessed)
+        if self.book is not None and get_strategy(self.book.method) is get_strategy(method):
+            opening = self.book.lookup(d_progress_word, wrong_guessed)
+            if opening is not None:
+                count, letters = opening
+                return LazyWordList(self.index, d_progress_word, wrong_guessed, count), letters
+
+        if self.cache is None:
+            return self.state.analyze(method, self.pool)
+
+        key = self.cache.get_key(d_progress_word, wrong_guessed, self.index, method)
+        cached = self.cache.get(key)
+        if cached is not None:
+            count, letters = cached
+            return LazyWordList(self.index, d_progress_word, wrong_guessed, count), letters
+
+        word_analysis = self.state.analyze(method, self.pool)
+        # Only the number of candidates is cached, a cache of whole candidate lists would hold most of the wordlist
+        self.cache.put(key, (len(word_analysis[0]), word_analysis[1]))
+        return word_analysis
 
     def guess(self, d_progress_word: str,
               wrong_guessed: list[str]) -> tuple[list[str], list[list[str, int]]]:
@@ -217,101 +582,245 @@ class Bot:
         :return:
         """
 
-        word_analysis = get_word_analysis_meth1(d_progress_word, wrong_guessed, self.wordlist_path)
+        word_analysis = self.analyze(d_progress_word, wrong_guessed)
         print(f'Possible words: {len(word_analysis[0])}')
         if len(word_analysis[0]) <= 10:
             print(word_analysis[0])
 
         return word_analysis
 
-    def loop_ask(self, method: int = 1) -> None:
+    def play(self, engine: GameEngine,
+             method: str | int | Strategy = 1) -> bool:
+        """
+        Plays the current game of a game engine to the end.
+
+        :param engine: The game engine with a started game.
+        :param method: Name or number of a registered strategy.
+        :return: True if the bot won.
+        """
+
+        while not engine.is_finished:
+            letters = self.analyze(engine.progress_word, engine.wrong_guessed, method)[1]
+            if not letters:
+                break
+
+            engine.guess(letters[0][0])
+
+        return engine.is_won
+
+    def loop_ask(self, method: str | int | Strategy = 1) -> None:
         """
         Asks in a loop for a progress word and wrong guessed letters and prints out some information.
 
+        :param method: Name or number of a registered strategy.
         :return:
         """
 
+        # Sends the letter ranking of every guess to a running visualization
+        live_data = LiveDataPublisher()
         while True:
             progress_word: str = cs.input('Progress word: ')
             if progress_word == '':
                 stop = cs.input('Do you want to quit the game? ').lower()
                 if stop == 'y' or stop == 'yes':
-                    open('live_data.json', 'w', encoding='utf-8').close()
+                    live_data.publish([])
+                    live_data.close()
                     quit()
 
-            wrong_guessed: list[str] = cs.input('Wrong guessed letters: ').split(',')
-            if method == 1:
-                word_analysis = get_word_analysis_meth1(progress_word, wrong_guessed, self.wordlist_path)
-            else:
-                word_analysis = get_word_analysis_meth2(progress_word, wrong_guessed, self.wordlist_path)
+            wrong_guessed: list[str] = [letter.strip() for letter in cs.input('Wrong guessed letters: ').split(',')]
+            try:
+                word_analysis = self.analyze(progress_word, wrong_guessed, method)
+            except ValueError as error:
+                print(f'[italic red]{error}')
+                continue
 
             if len(word_analysis[0]) <= 10:
                 print(word_analysis[0])
 
             print(f'{len(word_analysis[0])} possible words left.')
-            if method == 1:
-                letter_freq_table = Table(title='[magenta]Letter frequencies')
-                letter_freq_table.add_column('Letter', justify='center', style='cyan')
-                letter_freq_table.add_column('Occurrence', justify='center', style='green')
-                letter_freq_table.add_column('Probability', justify='center', style='magenta')
-
-                for letter, occ in word_analysis[1][:5]:
-                    letter_freq_table.add_row(letter, str(occ), f'{occ / len(word_analysis[0]) * 100:.2f}%')
-
-                print()
-                cs.print(letter_freq_table)
-            else:
-                bit_table = Table(title='[magenta]Information in bits')
-                bit_table.add_column('Letter', justify='center', style='cyan')
-                bit_table.add_column('Information', justify='center', style='green')
-
-                for letter, info in word_analysis[1][:5]:
-                    bit_table.add_row(letter, str(info))
-
-                print()
-                cs.print(bit_table)
-
-            data_dict = {data[0]: data[1] for data in word_analysis[1]}
-            json_obj = json.dumps(data_dict, indent=4, ensure_ascii=False)
-            with open('live_data.json', 'w', encoding='utf-8') as file:
-                file.write(json_obj)
-
-    def method_comparison(self) -> None:
-        # Animation for the bar chart
-        # Still in progress
-        pass
-
-    # In progress
-    def test_bot(self):
+            strategy = get_strategy(method)
+            letter_table = Table(title=f'[magenta]{strategy.label}')
+            letter_table.add_column('Letter', justify='center', style='cyan')
+            letter_table.add_column(strategy.label, justify='center', style='green')
+            # Integer scores are numbers of words, so they can also be shown as the probability of a hit
+            counts_words = all(isinstance(score, int) for _, score in word_analysis[1][:5])
+            if counts_words:
+                letter_table.add_column('Probability', justify='center', style='magenta')
+
+            for letter, score in word_analysis[1][:5]:
+                if counts_words:
+                    letter_table.add_row(letter, str(score), f'{score / len(word_analysis[0]) * 100:.2f}%')
+                else:
+                    letter_table.add_row(letter, f'{score:.3f}')
+
+            print()
+            cs.print(letter_table)
+
+            live_data.publish(word_analysis[1])
+
+    def method_comparison(self, strategies: list[str | int] | None = None,
+                          sample: int | None = 2000,
+                          seed: int = 0,
+                          max_wrong_guesses: int = MAX_WRONG_GUESSES,
+                          output: str | None = None,
+                          chunk_size: int = 1000,
+                          live_data: LiveDataPublisher | None = None) -> list[dict[str, str | int | float | None]]:
         """
-        Test the bot by running it on every word in the wordlist.
-        Takes a lot of time at the moment.
-
-        :return:
-        :rtype: None
+        Compares strategies by letting each of them play the same words (see simulate_batch).
+        With the same sample, seed and wordlist, the results of two runs are directly comparable.
+
+        The words are played in chunks, in turns for every strategy, so the cumulative results of all strategies
+        converge together. After every chunk, the progress of the strategy is published to the visualization. The
+        comparison can be aborted with Ctrl+C and then reports the words played so far.
+
+        :param strategies: Names or numbers of the strategies to compare, defaults to all registered strategies.
+        :param sample: Number of randomly chosen words to play. If None, every word is played.
+        :param seed: Seed for the random sample.
+        :param max_wrong_guesses: Number of wrong guesses the bot may make without losing.
+        :param output: Optional path of a .json or .csv file the results are written to.
+        :param chunk_size: Number of words a strategy plays between two updates.
+        :param live_data: Optional publisher for the progress of the strategies.
+        :return: One row per strategy with the win rate, the mean and 95th percentile of the wrong guesses, the mean
+                 decision latency and the throughput.
         """
-        with open(self.wordlist_path, 'r', encoding='utf-8') as file:
-            words = [word.lower().strip() for word in file.readlines()]
 
-        start = time.time()
-        total_words = len(words)
-
-        for i, word in enumerate(words):
-            progress_word = '_' * len(word)
-            wrong_guessed = []
-            while True:
-                next_letter, progress_word = analyze_and_update(progress_word, wrong_guessed, word, self.wordlist_path)
-                print(f'Word: {word} | Progress: {progress_word} | Next letter: {next_letter}')
-
-                if progress_word == word:
-                    break
+        strategies = [get_strategy(strategy) for strategy in (strategies or list(STRATEGIES))]
+        # Sorted, so a seed plays the same words with the text and the compiled wordlist
+        words = sorted(self.index.words)
+        if sample is not None and sample < len(words):
+            words = random.Random(seed).sample(words, sample)
+        else:
+            # Chunks of a shuffled list are random samples, so the cumulative results are never biased
+            random.Random(seed).shuffle(words)
+
+        # Named after the source wordlist, also if its compiled version was loaded
+        wordlist_name = os.path.splitext(os.path.basename(self.wordlist_path))[0]
+        results = {strategy.name: [] for strategy in strategies}
+        stats = {strategy.name: {'decisions': 0, 'decision_time': 0.0, 'time': 0.0} for strategy in strategies}
+        try:
+            with Progress() as progress:
+                task = progress.add_task('[bright_magenta]Comparing...', total=len(words) * len(strategies))
+                for start in range(0, len(words), chunk_size):
+                    chunk = sorted(words[start:start + chunk_size], key=len)
+                    for strategy in strategies:
+                        start_time = time.perf_counter()
+                        results[strategy.name] += simulate_batch(chunk, self.index, strategy, max_wrong_guesses,
+                                                                 stats=stats[strategy.name])
+                        stats[strategy.name]['time'] += time.perf_counter() - start_time
+                        progress.update(task, advance=len(chunk))
+                        if live_data is not None:
+                            strategy_results = results[strategy.name]
+                            misses = [0] * (max_wrong_guesses + 2)
+                            for _, wrong in strategy_results:
+                                misses[min(wrong, max_wrong_guesses + 1)] += 1
+
+                            live_data.publish({
+                                'strategy': strategy.name,
+                                'wordlist': wordlist_name,
+                                'games': len(strategy_results),
+                                'total': len(words),
+                                'win_rate': sum(won for won, _ in strategy_results) / len(strategy_results),
+                                'misses': misses
+                            }, 'comparison')
+        except KeyboardInterrupt:
+            print('[italic red]Comparison aborted, the results only cover the words played so far.')
+
+        commit = get_commit()
+        rows = []
+        for strategy in strategies:
+            strategy_results = results[strategy.name]
+            wins = sum(won for won, _ in strategy_results)
+            wrong_guesses = [wrong for _, wrong in strategy_results]
+            decisions = stats[strategy.name]['decisions']
+            elapsed_time = stats[strategy.name]['time']
+            rows.append({
+                'strategy': strategy.name,
+                'wordlist': wordlist_name,
+                'backend': self.index.backend,
+                'sample': sample,
+                'seed': seed,
+                'commit': commit,
+                'games': len(strategy_results),
+                'wins': wins,
+                'win_rate': wins / len(strategy_results) if strategy_results else 0.0,
+                'mean_wrong_guesses': get_average(wrong_guesses) if strategy_results else 0.0,
+                'p95_wrong_guesses': get_percentile(wrong_guesses, 95),
+                'decisions': decisions,
+                'mean_decision_ms': stats[strategy.name]['decision_time'] / decisions * 1000 if decisions else 0.0,
+                'time': elapsed_time,
+                'games_per_second': len(strategy_results) / elapsed_time if elapsed_time else 0.0
+            })
+
+        print_comparison(rows)
+        if output is not None:
+            write_benchmark_results(rows, output)
+
+        return rows
+
+    def test_bot(self, sample: int | None = None,
+                 seed: int | None = None,
+                 processes: int | None = None,
+                 shard_size: int = 5000,
+                 max_wrong_guesses: int = MAX_WRONG_GUESSES,
+                 strategy: str | int | Strategy = 1) -> dict[str, float | int]:
+        """
+        Tests the bot by playing every word in the wordlist (or a random sample) to the end.
+        The words are sharded across a process pool whose workers hold the preloaded word index. Every shard is
+        played as one batch (see simulate_batch), so the words are sorted by length to let the games of a shard share
+        their states.
+
+        :param sample: Number of randomly chosen words to play. If None, every word is played.
+        :param seed: Seed for the random sample.
+        :param processes: Number of worker processes, defaults to the number of CPUs.
+        :param shard_size: Number of words per task.
+        :param max_wrong_guesses: Number of wrong guesses the bot may make without losing.
+        :param strategy: Name or number of a registered strategy.
+        :return: The number of games, wins, the win rate, the mean number of wrong guesses, the time and words/sec.
+        :rtype: dict[str, float | int]
+        """
 
-            elapsed_time = time.time() - start
-            remaining_time = elapsed_time / (i + 1) * (total_words - i - 1)
-            print(f"Progress: {(i + 1) / total_words:.2%} | Time elapsed: {elapsed_time:.2f} | Time left:"
-                  f"{remaining_time:.2f}")
+        words = sorted(self.index.words)
+        if sample is not None and sample < len(words):
+            words = random.Random(seed).sample(words, sample)
 
-            i += 1
+        words = sorted(words, key=len)
+        shards = [words[i:i + shard_size] for i in range(0, len(words), shard_size)]
+        games = 0
+        wins = 0
+        wrong_guesses = 0
+        start = time.time()
+        strategy = get_strategy(strategy)
+        book = self.book if self.book is not None and get_strategy(self.book.method) is strategy else None
+        with Pool(processes or cpu_count(), initializer=_init_test_worker,
+                  initargs=(self.wordlist_path, self.index.backend, strategy.name, max_wrong_guesses, book)) as pool, \
+                Progress() as progress:
+            task = progress.add_task('[bright_magenta]Testing...', total=len(words))
+            for shard_games, shard_wins, shard_wrong_guesses in pool.imap_unordered(_test_shard, shards):
+                games += shard_games
+                wins += shard_wins
+                wrong_guesses += shard_wrong_guesses
+                progress.update(task, advance=shard_games)
+
+        elapsed_time = time.time() - start
+        results = {
+            'games': games,
+            'wins': wins,
+            'win_rate': wins / games if games else 0.0,
+            'mean_wrong_guesses': wrong_guesses / games if games else 0.0,
+            'time': elapsed_time,
+            'words_per_second': games / elapsed_time if elapsed_time else 0.0
+        }
+
+        results_table = Table(title='[magenta]Test results')
+        results_table.add_column('Games', justify='center', style='cyan')
+        results_table.add_column('Win rate', justify='center', style='green')
+        results_table.add_column('Mean wrong guesses', justify='center', style='magenta')
+        results_table.add_column('Words/sec', justify='center', style='cyan')
+        results_table.add_row(str(games), f'{results["win_rate"] * 100:.2f}%',
+                              f'{results["mean_wrong_guesses"]:.2f}', f'{results["words_per_second"]:.1f}')
+        cs.print(results_table)
+
+        return results
 
 
 def start_dialog(args: list[str]) -> None:
@@ -329,6 +838,8 @@ def start_dialog(args: list[str]) -> None:
         print('[italic]Please consider using a terminal that supports "True Color".')
 
     bot_method = 1
+    backend = 'python'
+    processes = 1
     programm = None
     lang = None
     if args:
@@ -341,44 +852,100 @@ def start_dialog(args: list[str]) -> None:
         elif 'b2' in args:
             programm = 'bot'
             bot_method = 2
+        elif 'b3' in args:
+            programm = 'bot'
+            bot_method = 3
+        elif 'c' in args:
+            programm = 'comparison'
+
+        # Any registered strategy can also be selected by its name
+        for name in STRATEGIES:
+            if name in args:
+                bot_method = name
 
-            print('[italic red][bold]Warning:[/bold] Method 2 is still in progress.'
-                  'It could take a while to calculate the next letter and even showing wrong results.')
+        if 'np' in args:
+            backend = 'numpy'
+
+        if 'mp' in args:
+            processes = cpu_count()
 
         if 'en' in args:
             lang = 'en'
         elif 'ge' in args or 'de' in args:
             lang = 'de'
+        elif 'all' in args:
+            lang = 'all'
         elif 'h' in args or '-h' in args or '--help' in args:
-            print('Usage: python bot.py [b, v, t, b2] [en, ge]')
+            print('Usage: python bot.py [b, v, t, b2, b3, c] [strategy] [en, ge, all] [np] [mp] [-fps fps] '
+                  '[-n sample] [-o output-path] [-cache cache-path] [--metrics metrics-path] '
+                  '[--profile mode]')
             print('[cyan]b:[/cyan] Bot')
             print('[cyan]v:[/cyan] Visualization')
             print('[cyan]t:[/cyan] Testing')
-            print('[cyan]b2:[/cyan] Bot with method 2 [bold italic red](in progress)')
+            print('[cyan]b2:[/cyan] Bot with method 2 (information in bits)')
+            print('[cyan]b3:[/cyan] Bot with method 3 (positional letter frequency)')
+            print('[cyan]c:[/cyan] Strategy comparison, with all languages for [cyan]all[/cyan]')
+            print(f'[cyan]strategy:[/cyan] Strategy of the bot or the test by name ({", ".join(STRATEGIES)})')
+            print('[cyan]np:[/cyan] Use the numpy backend')
+            print('[cyan]mp:[/cyan] Use all CPUs for the information of method 2')
+            print(f'[cyan]-fps:[/cyan] Frame cap of the visualization (default: {DEFAULT_FPS})')
+            print('[cyan]-n:[/cyan] Number of words per strategy of the comparison, 0 for all words (default: 2000)')
+            print('[cyan]-o:[/cyan] Write the results of the comparison to a .json or .csv file')
+            print('[cyan]-cache:[/cyan] Keep the analyses of the bot in a file, so the next runs start warm')
+            print('[cyan]--metrics:[/cyan] Save stage timings, candidate sizes and cache hit rates on exit (JSON, or '
+                  'Prometheus text for .prom)')
+            print('[cyan]--profile:[/cyan] Profile with cprofile or tracemalloc, optionally saved with mode:path')
             quit()
 
     if programm is None:
-        programm = cs.input('[cyan]Bot[/cyan] / [cyan]Visualization[/cyan] / [cyan]Testing[/cyan]?: ').lower()
+        programm = cs.input('[cyan]Bot[/cyan] / [cyan]Visualization[/cyan] / [cyan]Testing[/cyan] / '
+                            '[cyan]Comparison[/cyan]?: ').lower()
     if lang is None:
         lang = cs.input('[cyan]Language:[/cyan] (german, english) ').lower()
 
+    wordlists = [find_wordlist('Wordlists/wordlist_english.txt'), find_wordlist('Wordlists/wordlist_german.txt')]
     if lang == 'en':
-        wordlist = 'Wordlists/wordlist_english.txt'
+        wordlist = wordlists[0]
     elif lang == 'ge' or lang == 'de':
-        wordlist = 'Wordlists/german.txt'
+        wordlist = wordlists[1]
+    elif lang == 'all' and 'c' in programm:
+        wordlist = None
     else:
         print('[italic red]Language not supported.')
         quit()
 
+    if backend == 'numpy' and np is None:
+        print('[italic red]The numpy backend requires numpy to be installed.')
+        quit()
+
+    instrumentation.configure(args)
     if 'b' in programm:
-        bot = Bot(wordlist)
+        book = find_opening_book(load_word_index(wordlist, backend), bot_method)
+        cache_path = args[args.index('-cache') + 1] if '-cache' in args[:-1] else None
+        bot = Bot(wordlist, backend, processes, book, AnalysisCache(disk_path=cache_path))
         bot.loop_ask(bot_method)
     elif 'v' in programm:
-        visualization = Visualisation()
-        visualization.run(searching_intervall=1)
+        fps = int(args[args.index('-fps') + 1]) if '-fps' in args else DEFAULT_FPS
+        visualization = Visualisation(fps)
+        visualization.run()
     elif 't' in programm:
-        bot = Bot(wordlist)
-        bot.test_bot()
+        book = find_opening_book(load_word_index(wordlist, backend), bot_method)
+        bot = Bot(wordlist, backend, book=book)
+        bot.test_bot(strategy=bot_method)
+    elif 'c' in programm:
+        sample = int(args[args.index('-n') + 1]) if '-n' in args else 2000
+        output = args[args.index('-o') + 1] if '-o' in args else None
+        rows = []
+        # Streams the progress of the strategies to a running visualization
+        live_data = LiveDataPublisher()
+        for path in (wordlists if wordlist is None else [wordlist]):
+            rows += Bot(path, backend).method_comparison(sample=sample or None, live_data=live_data)
+
+        live_data.close()
+
+        if output is not None:
+            write_benchmark_results(rows, output)
+            print(f'Saved the comparison to [cyan]{output}[/cyan].')
     else:
         print('[italic red]Invalid program.')
         quit()
@@ -0,0 +1,55 @@
+# Import libraries
+import os
+import sys
+from rich import print
+from rich.traceback import install
+
+from tools import compile_wordlist, get_compiled_path, is_compiled_wordlist, preprocess_wordlist, WordIndex
+
+
+install()
+
+
+def start_dialog(args: list[str]) -> None:
+    """
+    Compiles the wordlists given on the command line.
+
+    :param args: Command line arguments
+    :type args: list[str]
+    :return:
+    :rtype: None
+    """
+
+    if len(args) < 2 or '-h' in args:
+        print('Usage: python3 compile_wordlist.py wordlist-path [-o output-path] [-c cleaned-path] [-s run-size]')
+        print('[bright_green]Options:')
+        print('[cyan]-o:[/cyan] Path of the compiled wordlist (default: wordlist path with the .bin extension)')
+        print('[cyan]-c:[/cyan] Clean the wordlist first (lowercase, only valid letters, no duplicates) and write it '
+              'to this path, which can be the wordlist itself')
+        print('[cyan]-s:[/cyan] Deduplicate with an external sort in runs of this many words (for huge wordlists)')
+        quit()
+
+    wordlist = args[1]
+    output = args[args.index('-o') + 1] if '-o' in args else None
+    cleaned = args[args.index('-c') + 1] if '-c' in args else None
+    run_size = int(args[args.index('-s') + 1]) if '-s' in args else None
+    if not os.path.exists(wordlist):
+        print('[italic red]Wordlist not found.')
+        quit()
+    elif is_compiled_wordlist(wordlist):
+        print('[italic red]The wordlist is already compiled.')
+        quit()
+
+    if cleaned is not None:
+        bucket_sizes = preprocess_wordlist(wordlist, cleaned, output, run_size)
+        print(f'Cleaned [bright_green]{sum(bucket_sizes.values())}[/bright_green] words into '
+              f'[cyan]{cleaned}[/cyan].')
+        output = output or get_compiled_path(cleaned)
+    else:
+        output = compile_wordlist(wordlist, output)
+
+    print(f'Compiled [bright_green]{len(WordIndex(output))}[/bright_green] words to [cyan]{output}[/cyan].')
+
+
+if __name__ == '__main__':
+    start_dialog(sys.argv)
@@ -4,15 +4,82 @@ import sys
 import random
 from rich import print
 from rich.console import Console
-from rich.progress import Progress
 from rich.traceback import install
 
-from tools import txt2list, get_new_progress_word, get_word_analysis_meth1
+import instrumentation
+from adversary import EvilHangman, LookaheadHangman
+from tools import get_new_progress_word, find_wordlist, load_word_index, np, BACKENDS, WordIndex
 
 
 install()
 cs = Console()
 
+# Define constants
+HANGMAN_ASCII: list[list[str]] = [
+    ['----------      '],
+    ['     |          ',
+     '     |          ',
+     '     |          ',
+     '     |          ',
+     '----------      '],
+    ['     _________  ',
+     '     |          ',
+     '     |          ',
+     '     |          ',
+     '     |          ',
+     '----------      '],
+    ['     _________  ',
+     '     | /        ',
+     '     |/         ',
+     '     |          ',
+     '     |          ',
+     '----------      '],
+    ['     _________  ',
+     '     | /     |  ',
+     '     |/         ',
+     '     |          ',
+     '     |          ',
+     '----------      '],
+    ['     _________  ',
+     '     | /     |  ',
+     '     |/      O  ',
+     '     |          ',
+     '     |          ',
+     '----------      '],
+    ['     _________  ',
+     '     | /     |  ',
+     '     |/      O  ',
+     '     |       |  ',
+     '     |          ',
+     '----------      '],
+    ['     _________  ',
+     '     | /     |  ',
+     '     |/      O  ',
+     '     |      /|  ',
+     '     |          ',
+     '----------      '],
+    ['     _________  ',
+     '     | /     |  ',
+     '     |/      O  ',
+     '     |      /|\\',
+     '     |          ',
+     '----------      '],
+    ['     _________  ',
+     '     | /     |  ',
+     '     |/      O  ',
+     '     |      /|\\',
+     '     |      /   ',
+     '----------      '],
+    ['     _________  ',
+     '     | /     |  ',
+     '     |/      O  ',
+     '     |      /|\\',
+     '     |      / \\',
+     '----------      ']
+]
+# The game is lost with the first wrong guess after the last hangman stage
+MAX_WRONG_GUESSES: int = len(HANGMAN_ASCII) - 1
+
 
 # Classes
 class Modes:
@@ -20,107 +87,190 @@ class Modes:
     Enum class for the game modes
     """
     NORMAL = 'normal'
-    IMPOSSIBLE = 'impossible'  # In development
+    IMPOSSIBLE = 'impossible'
+
+
+class Outcomes:
+    """
+    Enum class for the outcomes of a guess
+    """
+    HIT = 'hit'
+    MISS = 'miss'
+    REPEATED = 'repeated'
+    WON = 'won'
+    LOST = 'lost'
+    INVALID = 'invalid'
+    FINISHED = 'finished'
+
+
+class GameEngine:
+    """
+    The rules of the game without any input or output, so games can be played programmatically.
+    """
+
+    def __init__(self, wordlist: str | WordIndex,
+                 mode: str = Modes.NORMAL,
+                 backend: str = 'python',
+                 lookahead: int = 0,
+                 max_wrong_guesses: int = MAX_WRONG_GUESSES,
+                 seed: int | None = None) -> None:
+        """
+        :param wordlist: Path to the wordlist or a loaded word index.
+        :param mode: The game mode.
+        :param backend: The backend of the word index.
+        :param lookahead: Number of guesses the adversary of the impossible mode searches ahead, 0 keeps the largest
+                          family.
+        :param max_wrong_guesses: Number of wrong guesses that are allowed. The next one loses the game.
+        :param seed: Seed for choosing the words.
+        """
+
+        self.mode = mode
+        self.index = load_word_index(wordlist, backend)
+        self.lookahead = lookahead
+        self.max_wrong_guesses = max_wrong_guesses
+        self.random = random.Random(seed)
+
+        self.word: str | None = None
+        self.adversary: EvilHangman | None = None
+        self.progress_word = ''
+        self.wrong_guessed: list[str] = []
+        self.guesses = 0
+
+    def new_game(self, word: str | None = None,
+                 length: int | None = None) -> str:
+        """
+        Starts a new game.
+
+        :param word: The word to guess. If None, a random word (of the given length) is chosen. Ignored in the
+                     impossible mode.
+        :param length: Length of the word. In the impossible mode it defaults to the most common word length.
+        :return: The progress word.
+        """
+
+        self.adversary = None
+        if self.mode == Modes.IMPOSSIBLE:
+            if length is not None and not self.index.bucket_sizes.get(length):
+                raise ValueError(f'The wordlist has no words of length {length}.')
+
+            # The adversary doesn't pick a word, it keeps every word of the length
+            if self.lookahead > 0:
+                self.adversary = LookaheadHangman(self.index, length, depth=self.lookahead)
+            else:
+                self.adversary = EvilHangman(self.index, length)
+            self.word = None
+            self.progress_word = self.adversary.progress_word
+        else:
+            if word is None:
+                if length is not None:
+                    words = self.index.get_bucket(length)
+                    if not words:
+                        raise ValueError(f'The wordlist has no words of length {length}.')
+                else:
+                    words = self.index.words
+                word = self.random.choice(words)
+            self.word = word.lower()
+            self.progress_word = '_' * len(self.word)
+
+        self.wrong_guessed = []
+        self.guesses = 0
+        return self.progress_word
+
+    @property
+    def is_won(self) -> bool:
+        return self.progress_word != '' and '_' not in self.progress_word
+
+    @property
+    def is_lost(self) -> bool:
+        return len(self.wrong_guessed) > self.max_wrong_guesses
+
+    @property
+    def is_finished(self) -> bool:
+        return self.is_won or self.is_lost
+
+    @property
+    def solution(self) -> str | None:
+        """
+        The word of the game. In the impossible mode it is one of the words that are still possible.
+        """
+
+        if self.adversary is not None:
+            return self.progress_word if self.is_won else self.adversary.get_word()
+
+        return self.word
+
+    @property
+    def state(self) -> dict[str, str | list[str] | int | bool]:
+        return {
+            'mode': self.mode,
+            'progress_word': self.progress_word,
+            'wrong_guessed': list(self.wrong_guessed),
+            'guesses': self.guesses,
+            'wrong_guesses_left': self.max_wrong_guesses - len(self.wrong_guessed),
+            'won': self.is_won,
+            'lost': self.is_lost
+        }
+
+    def guess(self, letter: str) -> str:
+        """
+        Guesses a letter.
+
+        :param letter: The guessed letter.
+        :return: One of the Outcomes. Repeated, invalid and guesses after the end of the game don't count.
+        """
+
+        letter = letter.lower()
+        if self.progress_word == '' or self.is_finished:
+            return Outcomes.FINISHED
+
+        if len(letter) != 1:
+            return Outcomes.INVALID
+
+        if letter in self.progress_word or letter in self.wrong_guessed:
+            return Outcomes.REPEATED
+
+        self.guesses += 1
+        if self.adversary is not None:
+            hit = self.adversary.guess(letter)
+            self.progress_word = self.adversary.progress_word
+        else:
+            progress_word = get_new_progress_word(self.progress_word, letter, self.word)
+            hit = progress_word != self.progress_word
+            self.progress_word = progress_word
+
+        if not hit:
+            self.wrong_guessed.append(letter)
+            return Outcomes.LOST if self.is_lost else Outcomes.MISS
+
+        return Outcomes.WON if self.is_won else Outcomes.HIT
 
 
 class Game:
     """
-    Main game class
+    Terminal front end of the game
     """
     def __init__(self, mode: str,
-                 wordlist_path: str,
-                 graphics: bool = True) -> None:
+                 wordlist: str | WordIndex,
+                 graphics: bool = True,
+                 backend: str = 'python',
+                 lookahead: int = 0) -> None:
         self.mode = mode
-        self.words = txt2list(wordlist_path)
+        self.engine = GameEngine(wordlist, mode, backend, lookahead)
 
         self.graphics = graphics
-        self.hangman_ascii = [
-            ['----------      '],
-            ['     |          ',
-             '     |          ',
-             '     |          ',
-             '     |          ',
-             '----------      '],
-            ['     _________  ',
-             '     |          ',
-             '     |          ',
-             '     |          ',
-             '     |          ',
-             '----------      '],
-            ['     _________  ',
-             '     | /        ',
-             '     |/         ',
-             '     |          ',
-             '     |          ',
-             '----------      '],
-            ['     _________  ',
-             '     | /     |  ',
-             '     |/         ',
-             '     |          ',
-             '     |          ',
-             '----------      '],
-            ['     _________  ',
-             '     | /     |  ',
-             '     |/      O  ',
-             '     |          ',
-             '     |          ',
-             '----------      '],
-            ['     _________  ',
-             '     | /     |  ',
-             '     |/      O  ',
-             '     |       |  ',
-             '     |          ',
-             '----------      '],
-            ['     _________  ',
-             '     | /     |  ',
-             '     |/      O  ',
-             '     |      /|  ',
-             '     |          ',
-             '----------      '],
-            ['     _________  ',
-             '     | /     |  ',
-             '     |/      O  ',
-             '     |      /|\\',
-             '     |          ',
-             '----------      '],
-            ['     _________  ',
-             '     | /     |  ',
-             '     |/      O  ',
-             '     |      /|\\',
-             '     |      /   ',
-             '----------      '],
-            ['     _________  ',
-             '     | /     |  ',
-             '     |/      O  ',
-             '     |      /|\\',
-             '     |      / \\',
-             '----------      ']
-        ]
-
-    def print_hangman(self, wrong_guessed: list,
-                      word: str) -> bool | None:
+        self.hangman_ascii = HANGMAN_ASCII
+
+    def print_hangman(self, wrong_guessed: list) -> None:
         """
         Print the hangman ASCII art
 
-        :param word: The word to guess
-        :type word: str
         :param wrong_guessed: List of wrong guessed letters
-        :return: bool | None
+        :return: None
         """
 
         if self.graphics:
             for line in self.hangman_ascii[len(wrong_guessed) - 1]:
                 print(line)
 
-            if len(wrong_guessed) > len(self.hangman_ascii) - 1:
-                print('[bright_red]You lost!')
-                print(f'The word was [bright_green]{word}[/bright_green].')
-                stop = input('Another game? ')
-                if stop == 'y' or stop == 'yes':
-                    return True
-                else:
-                    quit()
-
     def start(self) -> None:
         """
         Main game loop
@@ -128,75 +278,36 @@ class Game:
         :return: None
         """
 
-        word_lengths = {}
-        if self.mode == Modes.IMPOSSIBLE:
-            word_lengths = {}
-            for word in self.words:
-                if len(word) not in word_lengths:
-                    word_lengths[len(word)] = 1
-                else:
-                    word_lengths[len(word)] += 1
-
-            # Sort the dictionary by value
-            word_lengths = dict(sorted(word_lengths.items(), key=lambda item: item[1], reverse=True))
-
         while True:
-            if self.mode == Modes.IMPOSSIBLE:
-                word = '_' * list(word_lengths.keys())[0]
-            else:
-                word: str = random.choice(self.words).lower()
-            progress_word = '_' * len(word)
-            wrong_guessed = []
+            self.engine.new_game()
             while True:
-                print(progress_word)
+                print(self.engine.progress_word)
 
                 letter = input('Letter: ')
                 if letter == '':
                     stop = input('Do you want to quit the game? ').lower()
                     if stop == 'yes' or stop == 'y':
-                        print(f'The word was [bright_green]{word}[/bright_green].')
+                        print(f'The word was [bright_green]{self.engine.solution}[/bright_green].')
                         quit()
 
-                if self.mode == Modes.NORMAL:
-                    if get_new_progress_word(progress_word, letter, word) == progress_word:
-                        wrong_guessed.append(letter)
-
-                        if self.print_hangman(wrong_guessed, word):
-                            break
-
-                    progress_word = get_new_progress_word(progress_word, letter, word)
-                else:
-                    words_with_letter = 0
-                    for word in self.words:
-                        if letter in word:
-                            words_with_letter += 1
-
-                    word_without_letter = len(self.words) - words_with_letter
-
-                    if words_with_letter > word_without_letter:
-                        possible_words = {}
-                        with Progress() as progress:
-                            task = progress.add_task('[bright_magenta]Calculating...', total=len(self.words))
-                            for word in self.words:
-                                if letter in word:
-                                    words_left = len(get_word_analysis_meth1(progress_word,
-                                                                             wrong_guessed,
-                                                                             'Wordlists/german.txt')[0])
-                                    possible_words[word] = words_left
-
-                                progress.update(task, advance=1)
-
-                        possible_words = dict(sorted(possible_words.items(), key=lambda item: item[1], reverse=True))
-                        print(possible_words)
-                    else:
-                        wrong_guessed.append(letter)
-
-                        if self.print_hangman(wrong_guessed, word):
-                            break
-
-                if progress_word == word:
-                    print(progress_word)
+                    continue
+
+                outcome = self.engine.guess(letter)
+                if outcome == Outcomes.INVALID:
+                    print('[italic red]Please enter a single letter.')
+                elif outcome == Outcomes.REPEATED:
+                    print(f'[italic red]You already guessed {letter}.')
+                elif outcome == Outcomes.MISS or outcome == Outcomes.LOST:
+                    self.print_hangman(self.engine.wrong_guessed)
+
+                if outcome == Outcomes.LOST:
+                    print('[bright_red]You lost!')
+                    print(f'The word was [bright_green]{self.engine.solution}[/bright_green].')
+                elif outcome == Outcomes.WON:
+                    print(self.engine.progress_word)
                     print('[bright_green]You won!')
+
+                if self.engine.is_finished:
                     stop = input('Another game? ')
                     if stop == 'y' or stop == 'yes':
                         break
@@ -216,6 +327,8 @@ def start_dialog(args: list[str]) -> None:
         print('[italic]Please consider using a terminal that supports "True Color".')
 
     game_mode = None
+    backend = 'python'
+    lookahead = 0
     wordlist = None
     lang = None
     if len(args) > 1:
@@ -231,12 +344,24 @@ def start_dialog(args: list[str]) -> None:
         if '-m' in args:
             game_mode = args[args.index('-m') + 1]
 
+        if '-b' in args:
+            backend = args[args.index('-b') + 1]
+
+        if '-d' in args:
+            lookahead = int(args[args.index('-d') + 1])
+
         if '-h' in args:
-            print('Usage: python3 game.py [-w wordlist-path] [-l language] [-m mode]')
+            print('Usage: python3 game.py [-w wordlist-path] [-l language] [-m mode] [-b backend] [-d depth] '
+                  '[--metrics metrics-path] [--profile mode]')
             print('[bright_green]Options:')
-            print('[cyan]-w:[/cyan] Wordlist path')
+            print('[cyan]-w:[/cyan] Wordlist path (text or compiled wordlist)')
             print('[cyan]-l:[/cyan] Language (german/english)')
             print('[cyan]-m:[/cyan] Game mode (normal/impossible)')
+            print('[cyan]-b:[/cyan] Backend for the word analysis (python/numpy)')
+            print('[cyan]-d:[/cyan] Number of guesses the impossible mode searches ahead (default: 0)')
+            print('[cyan]--metrics:[/cyan] Save stage timings, candidate sizes and cache hit rates on exit (JSON, or '
+                  'Prometheus text for .prom)')
+            print('[cyan]--profile:[/cyan] Profile with cprofile or tracemalloc, optionally saved with mode:path')
             quit()
 
     if game_mode is None:
@@ -249,22 +374,29 @@ def start_dialog(args: list[str]) -> None:
         game_mode = Modes.NORMAL
     elif game_mode == 'impossible':
         game_mode = Modes.IMPOSSIBLE
-
-        print('[italic red][bold]Warning: [/bold]This mode is still in development. '
-              'It can currently take a long time to calculate.')
     else:
         print('[italic red]Mode not supported.')
         quit()
 
-    if lang == 'german' or lang == 'de':
-        wordlist = 'Wordlists/german.txt'
-    elif lang == 'english' or lang == 'en' or lang == '':
-        wordlist = 'Wordlists/wordlist_english.txt'
-    else:
-        print('[italic red]Language not supported.')
+    # A wordlist given with -w takes precedence over the language
+    if wordlist is None:
+        if lang == 'german' or lang == 'de':
+            wordlist = find_wordlist('Wordlists/wordlist_german.txt')
+        elif lang == 'english' or lang == 'en' or lang == '':
+            wordlist = find_wordlist('Wordlists/wordlist_english.txt')
+        else:
+            print('[italic red]Language not supported.')
+            quit()
+
+    if backend not in BACKENDS:
+        print('[italic red]Backend not supported.')
+        quit()
+    elif backend == 'numpy' and np is None:
+        print('[italic red]The numpy backend requires numpy to be installed.')
         quit()
 
-    game = Game(game_mode, wordlist)
+    instrumentation.configure(args)
+    game = Game(game_mode, wordlist, backend=backend, lookahead=lookahead)
 
     game.start()
 
@@ -0,0 +1,367 @@
+# Import libraries
+import os
+import json
+import atexit
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from rich import print
+from functools import wraps
+from time import perf_counter
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterator
+
+
+# Define constants
+# Environment variables that enable the instrumentation without a command line flag
+METRICS_ENV: str = 'HANGMAN_METRICS'
+PROFILE_ENV: str = 'HANGMAN_PROFILE'
+# Upper bounds of the histogram buckets for durations in seconds and for sizes, e.g. of candidate sets
+TIME_BUCKETS: tuple[float, ...] = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                                   0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS: tuple[float, ...] = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000,
+                                   100000, 250000, 1000000)
+# Number of functions or allocation sites printed by a profile
+PROFILE_TOP: int = 25
+PROFILE_MODES: tuple[str, ...] = ('cprofile', 'tracemalloc')
+
+_NULL_CONTEXT = nullcontext()
+
+
+# Classes
+class Histogram:
+    """
+    Counts observations in buckets with fixed upper bounds, like a Prometheus histogram.
+    """
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        # Observations per bucket, the last one counts everything above the highest bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Adds an observation.
+
+        :param value: The observed value.
+        :return: None
+        """
+
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def get_cumulative_counts(self) -> list[tuple[str, int]]:
+        """
+        Returns the number of observations up to each bound, the last bound is +Inf.
+
+        :return: The bounds and the cumulative counts.
+        """
+
+        bounds = [f'{bound:g}' for bound in self.buckets] + ['+Inf']
+        total = 0
+        cumulative_counts = []
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            cumulative_counts.append((bound, total))
+
+        return cumulative_counts
+
+
+class Metrics:
+    """
+    Counters and histograms of one process. Worker processes (see AnalysisPool and server.py) record their own metrics,
+    which aren't merged into the ones of the main process.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.counters: dict[str, int] = {}
+        # Histograms keyed by their name and their label
+        self.histograms: dict[tuple[str, str], Histogram] = {}
+        self.lock = threading.Lock()
+
+    def count(self, name: str,
+              amount: int = 1) -> None:
+        """
+        Increases a counter.
+
+        :param name: Name of the counter.
+        :param amount: The increment.
+        :return: None
+        """
+
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str,
+                value: float,
+                label: str = '',
+                buckets: tuple[float, ...] = SIZE_BUCKETS) -> None:
+        """
+        Adds an observation to a histogram.
+
+        :param name: Name of the histogram.
+        :param value: The observed value.
+        :param label: Label of the histogram, e.g. the stage of a timing.
+        :param buckets: Bucket bounds, if the histogram doesn't exist yet.
+        :return: None
+        """
+
+        with self.lock:
+            histogram = self.histograms.get((name, label))
+            if histogram is None:
+                histogram = self.histograms[name, label] = Histogram(buckets)
+
+            histogram.observe(value)
+
+    def get_hit_rates(self) -> dict[str, float]:
+        """
+        Calculates the hit rate of every counter pair <name>_hits and <name>_misses. Other counters of the same name
+        that end with hits (e.g. <name>_disk_hits) also count as hits.
+
+        :return: The hit rates keyed by the name.
+        """
+
+        hit_rates = {}
+        for counter, misses in self.counters.items():
+            if not counter.endswith('_misses'):
+                continue
+
+            name = counter[:-len('_misses')]
+            hits = sum(count for hit_counter, count in self.counters.items()
+                       if hit_counter.startswith(name + '_') and hit_counter.endswith('hits'))
+            hit_rates[name] = hits / (hits + misses) if hits + misses else 0.0
+
+        return hit_rates
+
+    def to_json(self) -> dict:
+        """
+        Returns the counters, the hit rates and the histograms with their count, sum, mean and cumulative buckets.
+
+        :return: A JSON serializable dictionary.
+        """
+
+        with self.lock:
+            histograms = {}
+            for (name, label), histogram in sorted(self.histograms.items()):
+                histograms.setdefault(name, {})[label or name] = {
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'mean': histogram.sum / histogram.count if histogram.count else 0.0,
+                    'buckets': dict(histogram.get_cumulative_counts())
+                }
+
+            return {'counters': dict(self.counters), 'hit_rates': self.get_hit_rates(), 'histograms': histograms}
+
+    def to_prometheus(self, prefix: str = 'hangman') -> str:
+        """
+        Returns the counters and histograms in the Prometheus text format. Stage timings are labeled with the stage.
+
+        :param prefix: Prefix of the metric names.
+        :return: The metrics as text.
+        """
+
+        with self.lock:
+            lines = []
+            for name, count in sorted(self.counters.items()):
+                lines.append(f'# TYPE {prefix}_{name}_total counter')
+                lines.append(f'{prefix}_{name}_total {count}')
+
+            last_name = None
+            for (name, label), histogram in sorted(self.histograms.items()):
+                if name != last_name:
+                    lines.append(f'# TYPE {prefix}_{name} histogram')
+                    last_name = name
+
+                labels = f'stage="{label}",' if label else ''
+                for bound, count in histogram.get_cumulative_counts():
+                    lines.append(f'{prefix}_{name}_bucket{{{labels}le="{bound}"}} {count}')
+                labels = f'{{stage="{label}"}}' if label else ''
+                lines.append(f'{prefix}_{name}_sum{labels} {histogram.sum}')
+                lines.append(f'{prefix}_{name}_count{labels} {histogram.count}')
+
+            return '\n'.join(lines) + '\n'
+
+    def save(self, path: str) -> None:
+        """
+        Saves the metrics in the Prometheus text format if the path ends with .prom or .txt, else as JSON.
+
+        :param path: Path of the metrics file.
+        :return: None
+        """
+
+        with open(path, 'w', encoding='utf-8') as file:
+            if path.endswith(('.prom', '.txt')):
+                file.write(self.to_prometheus())
+            else:
+                json.dump(self.to_json(), file, indent=4)
+
+    def clear(self) -> None:
+        """
+        Removes all counters and histograms.
+
+        :return: None
+        """
+
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+METRICS = Metrics()
+
+
+# Functions
+def count(name: str,
+          amount: int = 1) -> None:
+    """
+    Increases a counter, if the instrumentation is enabled.
+
+    :param name: Name of the counter, e.g. analysis_cache_hits.
+    :param amount: The increment.
+    :return: None
+    """
+
+    if METRICS.enabled:
+        METRICS.count(name, amount)
+
+
+def observe(name: str,
+            value: float) -> None:
+    """
+    Adds a size to a histogram, if the instrumentation is enabled.
+
+    :param name: Name of the histogram, e.g. candidates.
+    :param value: The observed size.
+    :return: None
+    """
+
+    if METRICS.enabled:
+        METRICS.observe(name, value)
+
+
+@contextmanager
+def _timer(stage: str) -> Iterator[None]:
+    """
+    Records the duration of the with block as a stage.
+
+    :param stage: Name of the stage.
+    """
+
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.observe('stage_seconds', perf_counter() - start, stage, TIME_BUCKETS)
+
+
+def timed(stage: str):
+    """
+    Returns a context manager that records the duration of a stage, if the instrumentation is enabled.
+
+    :param stage: Name of the stage, e.g. filter.
+    :return: The context manager.
+    """
+
+    return _timer(stage) if METRICS.enabled else _NULL_CONTEXT
+
+
+def instrument(stage: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator that records the duration of every call of a function as a stage, if the instrumentation is enabled.
+
+    :param stage: Name of the stage.
+    :return: The decorator.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return function(*args, **kwargs)
+
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                METRICS.observe('stage_seconds', perf_counter() - start, stage, TIME_BUCKETS)
+
+        return wrapper
+
+    return decorator
+
+
+def start_profile(mode: str,
+                  path: str | None = None) -> Callable[[], None]:
+    """
+    Starts profiling the process with cProfile or tracemalloc.
+
+    :param mode: 'cprofile' or 'tracemalloc'.
+    :param path: Optional path the cProfile stats or the tracemalloc statistics are saved to.
+    :return: A function that stops the profile and prints the top functions or allocation sites.
+    """
+
+    if mode == 'cprofile':
+        profile = cProfile.Profile()
+        profile.enable()
+
+        def stop() -> None:
+            profile.disable()
+            if path is not None:
+                profile.dump_stats(path)
+            pstats.Stats(profile).sort_stats('cumulative').print_stats(PROFILE_TOP)
+    elif mode == 'tracemalloc':
+        tracemalloc.start()
+
+        def stop() -> None:
+            top_stats = tracemalloc.take_snapshot().statistics('lineno')
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            lines = [f'Current: {current / 1024 ** 2:.2f} MiB, peak: {peak / 1024 ** 2:.2f} MiB'] + \
+                [str(stat) for stat in top_stats[:PROFILE_TOP]]
+            if path is not None:
+                with open(path, 'w', encoding='utf-8') as file:
+                    file.write('\n'.join(lines) + '\n')
+            print('\n'.join(lines))
+    else:
+        raise ValueError(f'Unknown profile mode {mode}.')
+
+    return stop
+
+
+def configure(args: list[str]) -> None:
+    """
+    Enables the instrumentation with the --metrics and --profile options of the command line or the HANGMAN_METRICS
+    and HANGMAN_PROFILE environment variables. The metrics and profiles are written when the process exits.
+
+    --metrics path: Records stage timings, candidate set sizes and cache hit rates and saves them to the path, in the
+    Prometheus text format for .prom/.txt and as JSON otherwise.
+    --profile mode[:path]: Profiles the process with cProfile or tracemalloc and prints the top entries, optionally
+    also saving them to the path.
+
+    :param args: Command line arguments
+    :return: None
+    """
+
+    metrics_path = args[args.index('--metrics') + 1] if '--metrics' in args[:-1] else os.environ.get(METRICS_ENV)
+    profile = args[args.index('--profile') + 1] if '--profile' in args[:-1] else os.environ.get(PROFILE_ENV)
+    if metrics_path:
+        METRICS.enabled = True
+        atexit.register(METRICS.save, metrics_path)
+
+    if profile:
+        mode, _, profile_path = profile.partition(':')
+        if mode not in PROFILE_MODES:
+            print(f'[italic red]Profile mode not supported, use one of {", ".join(PROFILE_MODES)}.')
+            quit()
+
+        atexit.register(start_profile(mode, profile_path or None))
+
+
+if __name__ == '__main__':
+    print('This script is not meant to be run directly.')
@@ -0,0 +1,170 @@
+# Import libraries
+import json
+import socket
+import threading
+import time
+from typing import Callable
+
+
+# Define constants
+DEFAULT_HOST: str = '127.0.0.1'
+DEFAULT_PORT: int = 8766
+# Seconds a subscriber waits before it tries to reach the publisher again
+RECONNECT_INTERVAL: float = 1.0
+
+
+# Classes
+class LiveDataPublisher:
+    """
+    Pushes the letter ranking of the bot or the progress of a strategy comparison to the visualisation over a local
+    socket.
+
+    Every update is sent as one JSON line with a sequence number and its kind, e.g.
+    {"seq": 3, "kind": "letters", "data": [["e", 1200], ...]}. Subscribers that connect later get the latest update
+    right away. Without subscribers, publishing only stores the update, so the bot doesn't pay for the serialization.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST,
+                 port: int = DEFAULT_PORT) -> None:
+        """
+        :param host: Host to listen on.
+        :param port: Port to listen on. If it is already in use, the publisher stays disabled.
+        """
+
+        self.seq = 0
+        self.kind = 'letters'
+        self.data: list | dict = []
+        self.subscribers: list[socket.socket] = []
+        self.lock = threading.Lock()
+        try:
+            self.server: socket.socket | None = socket.create_server((host, port))
+        except OSError:
+            self.server = None
+            return
+
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+
+    def get_message(self) -> bytes:
+        """
+        Returns the latest update as a JSON line.
+
+        :return: The encoded message.
+        """
+
+        return json.dumps({'seq': self.seq, 'kind': self.kind, 'data': self.data},
+                          ensure_ascii=False).encode('utf-8') + b'\n'
+
+    def accept_loop(self) -> None:
+        """
+        Accepts subscribers and sends them the latest update, until the publisher is closed.
+
+        :return: None
+        """
+
+        while True:
+            try:
+                subscriber, _ = self.server.accept()
+            except OSError:
+                return
+
+            with self.lock:
+                if self.send(subscriber, self.get_message()):
+                    self.subscribers.append(subscriber)
+
+    @staticmethod
+    def send(subscriber: socket.socket,
+             message: bytes) -> bool:
+        """
+        Sends a message without blocking the bot.
+
+        :param subscriber: Socket of the subscriber.
+        :param message: The encoded message.
+        :return: False if the subscriber is gone or doesn't keep up and was disconnected.
+        """
+
+        try:
+            subscriber.setblocking(False)
+            subscriber.sendall(message)
+            return True
+        except OSError:
+            subscriber.close()
+            return False
+
+    def publish(self, data: list | dict,
+                kind: str = 'letters') -> None:
+        """
+        Publishes an update to all subscribers.
+
+        :param data: For letters, the letters and their scores (an empty list clears the visualisation). For a
+                     comparison, the progress of one strategy (see Bot.method_comparison).
+        :param kind: 'letters' or 'comparison'.
+        :return: None
+        """
+
+        with self.lock:
+            self.seq += 1
+            self.kind = kind
+            self.data = data
+            if self.subscribers:
+                message = self.get_message()
+                self.subscribers = [subscriber for subscriber in self.subscribers if self.send(subscriber, message)]
+
+    def close(self) -> None:
+        """
+        Stops accepting subscribers and disconnects the connected ones.
+
+        :return: None
+        """
+
+        if self.server is not None:
+            self.server.close()
+
+        with self.lock:
+            for subscriber in self.subscribers:
+                subscriber.close()
+
+            self.subscribers = []
+
+
+class LiveDataSubscriber:
+    """
+    Receives the updates of a LiveDataPublisher in a background thread.
+    """
+
+    def __init__(self, callback: Callable[[int, str, list | dict], None],
+                 host: str = DEFAULT_HOST,
+                 port: int = DEFAULT_PORT) -> None:
+        """
+        :param callback: Called from the background thread with the sequence number, the kind and the data of every
+                         update.
+        :param host: Host of the publisher.
+        :param port: Port of the publisher.
+        """
+
+        self.callback = callback
+        self.address = (host, port)
+        threading.Thread(target=self.receive_loop, daemon=True).start()
+
+    def receive_loop(self) -> None:
+        """
+        Connects to the publisher and passes every update to the callback. If the publisher isn't running, it tries
+        again every RECONNECT_INTERVAL seconds. The last update stays visible after the publisher stopped.
+
+        :return: None
+        """
+
+        while True:
+            try:
+                with socket.create_connection(self.address) as connection, \
+                        connection.makefile('r', encoding='utf-8') as stream:
+                    for line in stream:
+                        json_obj = json.loads(line)
+                        self.callback(json_obj['seq'], json_obj['kind'], json_obj['data'])
+            except (OSError, ValueError, KeyError):
+                pass
+
+            time.sleep(RECONNECT_INTERVAL)
+
+
+if __name__ == '__main__':
+    print('This script is not meant to be run directly.')
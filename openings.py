@@ -0,0 +1,234 @@
+# Import libraries
+import os
+import sys
+import json
+from rich import print
+from rich.progress import Progress
+from rich.traceback import install
+
+from instrumentation import count
+from tools import ALPHABET, apply_pattern, get_compiled_path, get_state_key, get_strategy, \
+    load_word_index, rank_candidates, Strategy, WordIndex
+
+
+install()
+
+
+# Functions
+def get_book_path(wordlist_path: str,
+                  method: str | int | Strategy = 1) -> str:
+    """
+    Returns the default path of the opening book of a wordlist.
+
+    :param wordlist_path: Path to the wordlist.
+    :param method: Name or number of the strategy the book was built with.
+    :return: The wordlist path with the .openings<method>.json extension, using the number of the strategy if it has
+             one.
+    """
+
+    strategy = get_strategy(method)
+    method = strategy.method if strategy.method is not None else strategy.name
+    return os.path.splitext(get_compiled_path(wordlist_path))[0] + f'.openings{method}.json'
+
+
+class OpeningBook:
+    """
+    Precomputed letter rankings for the first plies of every word length.
+    """
+
+    def __init__(self, method: str | int,
+                 plies: int,
+                 size: int,
+                 entries: dict[str, dict] | None = None) -> None:
+        self.method = method
+        self.plies = plies
+        # Number of words in the wordlist the book was built for
+        self.size = size
+        # Number of candidates and letter ranking, keyed by the canonical state
+        self.entries: dict[str, dict] = entries if entries is not None else {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def matches(self, wordlist: str | WordIndex,
+                method: str | int | Strategy) -> bool:
+        """
+        Checks if the book can be used for a wordlist and a method.
+
+        :param wordlist: Path to the wordlist or a loaded word index.
+        :param method: Name or number of a registered strategy.
+        :return: True if the book was built with the method for a wordlist of the same size.
+        """
+
+        return get_strategy(self.method) is get_strategy(method) and self.size == len(load_word_index(wordlist))
+
+    def lookup(self, d_progress_word: str,
+               d_wrong_guessed: list[str]) -> tuple[int, list[list[str, int | float]]] | None:
+        """
+        Returns the number of candidates and the letter ranking of a state, if the state is in the book.
+
+        :param d_progress_word: The word with the already guessed letters and underscores as not-guessed letters.
+        :param d_wrong_guessed: A list of all wrong guessed letters.
+        :return: The number of candidates and the letter ranking, or None if the state isn't in the book.
+        """
+
+        entry = self.entries.get(get_state_key(d_progress_word, d_wrong_guessed))
+        if entry is None:
+            count('opening_book_misses')
+            return None
+
+        count('opening_book_hits')
+        return entry['count'], entry['letters']
+
+    def save(self, path: str) -> None:
+        """
+        Saves the book as JSON.
+
+        :param path: Path of the book.
+        :return: None
+        """
+
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'method': self.method, 'plies': self.plies, 'size': self.size, 'entries': self.entries}, file,
+                      ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> 'OpeningBook':
+        """
+        Loads a book saved with save.
+
+        :param path: Path of the book.
+        :return: The book.
+        """
+
+        with open(path, 'r', encoding='utf-8') as file:
+            json_obj = json.load(file)
+
+        return cls(json_obj['method'], json_obj['plies'], json_obj['size'], json_obj['entries'])
+
+
+def find_opening_book(wordlist: str | WordIndex,
+                      method: str | int | Strategy = 1) -> OpeningBook | None:
+    """
+    Loads the opening book of a wordlist from its default path, if it was built and matches the wordlist.
+
+    :param wordlist: Path to the wordlist or a loaded word index.
+    :param method: Name or number of a registered strategy.
+    :return: The opening book or None.
+    """
+
+    index = load_word_index(wordlist)
+    book_path = get_book_path(index.wordlist_path, method)
+    if not os.path.exists(book_path):
+        return None
+
+    book = OpeningBook.load(book_path)
+    if not book.matches(index, method):
+        print('[italic red]The opening book doesn\'t match the wordlist and is ignored.')
+        return None
+
+    return book
+
+
+def build_opening_book(wordlist: str | WordIndex,
+                       method: str | int = 1,
+                       plies: int = 3,
+                       min_candidates: int = 100,
+                       top: int = len(ALPHABET)) -> OpeningBook:
+    """
+    Builds an opening book by following the best letter of the given method for the first plies of every word length.
+    Every outcome of the best letter (each revealed pattern and the miss) is expanded, as long as it leaves at least
+    min_candidates candidates.
+
+    :param wordlist: Path to the wordlist or a loaded word index.
+    :param method: Name or number of a registered strategy.
+    :param plies: Number of guesses to precompute.
+    :param min_candidates: States with fewer candidates are cheap enough to analyze during the game.
+    :param top: Number of letters of the ranking to store per state.
+    :return: The opening book.
+    """
+
+    index = load_word_index(wordlist)
+    book = OpeningBook(method, plies, len(index))
+    with Progress() as progress:
+        task = progress.add_task('[bright_magenta]Building...', total=len(index.bucket_sizes))
+        for length in sorted(index.bucket_sizes):
+            bucket = index.get_encoded_bucket(length)
+            # States of the current ply: progress word, wrong guessed letters and the rows of their candidates
+            states = [('_' * length, [], bucket.filter('_' * length, []))]
+            for _ in range(plies):
+                next_states = []
+                for progress_word, wrong_guessed, rows in states:
+                    if len(rows) < min_candidates:
+                        continue
+
+                    guessed_letters = list(set(char for char in progress_word if char != '_')) + wrong_guessed
+                    ranking = rank_candidates(bucket, rows, guessed_letters, method)
+                    if not ranking:
+                        continue
+
+                    book.entries[get_state_key(progress_word, wrong_guessed)] = {'count': len(rows),
+                                                                                  'letters': ranking[:top]}
+
+                    # Expand every outcome of the best letter
+                    letter = ranking[0][0]
+                    for pattern in bucket.get_partitions(rows, [letter])[letter]:
+                        if pattern == 0:
+                            next_progress_word, next_wrong_guessed = progress_word, wrong_guessed + [letter]
+                        else:
+                            next_progress_word = apply_pattern(progress_word, letter, pattern)
+                            next_wrong_guessed = wrong_guessed
+
+                        next_rows = bucket.filter(next_progress_word, next_wrong_guessed, rows)
+                        next_states.append((next_progress_word, next_wrong_guessed, next_rows))
+
+                states = next_states
+
+            progress.update(task, advance=1)
+
+    return book
+
+
+def start_dialog(args: list[str]) -> None:
+    """
+    Builds the opening book of the wordlist given on the command line.
+
+    :param args: Command line arguments
+    :type args: list[str]
+    :return:
+    :rtype: None
+    """
+
+    if len(args) < 2 or '-h' in args:
+        print('Usage: python3 openings.py wordlist-path [-m method] [-p plies] [-c min-candidates] [-o output-path]')
+        print('[bright_green]Options:')
+        print('[cyan]-m:[/cyan] Strategy, by number (1: letter frequency, 2: information, 3: positional letter '
+              'frequency) or by name')
+        print('[cyan]-p:[/cyan] Number of guesses to precompute (default: 3)')
+        print('[cyan]-c:[/cyan] Minimum number of candidates of a stored state (default: 100)')
+        print('[cyan]-o:[/cyan] Path of the opening book')
+        quit()
+
+    wordlist = args[1]
+    method = args[args.index('-m') + 1] if '-m' in args else 1
+    method = int(method) if isinstance(method, str) and method.isdigit() else method
+    plies = int(args[args.index('-p') + 1]) if '-p' in args else 3
+    min_candidates = int(args[args.index('-c') + 1]) if '-c' in args else 100
+    output = args[args.index('-o') + 1] if '-o' in args else get_book_path(wordlist, method)
+    if not os.path.exists(wordlist):
+        print('[italic red]Wordlist not found.')
+        quit()
+
+    try:
+        get_strategy(method)
+    except ValueError:
+        print('[italic red]Strategy not supported.')
+        quit()
+
+    book = build_opening_book(wordlist, method, plies, min_candidates)
+    book.save(output)
+    print(f'Saved [bright_green]{len(book)}[/bright_green] states to [cyan]{output}[/cyan].')
+
+
+if __name__ == '__main__':
+    start_dialog(sys.argv)
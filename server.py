@@ -0,0 +1,368 @@
+# Import libraries
+import os
+import sys
+import json
+import asyncio
+from rich import print
+from rich.traceback import install
+from concurrent.futures import ProcessPoolExecutor
+
+import instrumentation
+from analysis_cache import AnalysisCache
+from openings import find_opening_book, OpeningBook
+from tools import find_wordlist, get_state_key, get_strategy, load_word_index, np, BACKENDS, GameState, LazyWordList, \
+    WordIndex
+
+
+install()
+
+# Define constants
+DEFAULT_HOST: str = '127.0.0.1'
+DEFAULT_PORT: int = 8765
+# Seconds a request may take if it doesn't set its own deadline
+DEFAULT_TIMEOUT: float = 10.0
+# Wordlists that can be requested by their language
+LANGUAGES: dict[str, str] = {
+    'english': 'Wordlists/wordlist_english.txt',
+    'en': 'Wordlists/wordlist_english.txt',
+    'german': 'Wordlists/wordlist_german.txt',
+    'de': 'Wordlists/wordlist_german.txt'
+}
+# Types of the fields of a request, every field is optional except the progress word
+REQUEST_FIELDS: dict[str, tuple[type, ...]] = {
+    'progress_word': (str,),
+    'wrong_guessed': (list, str),
+    'wordlist': (str,),
+    'method': (str, int),
+    'candidates': (int,),
+    'top': (int,),
+    'timeout': (int, float)
+}
+
+# Word indexes, opening books and analysis cache of a worker process
+_indexes: dict[str, WordIndex] = {}
+_books: dict[tuple[str, str], OpeningBook | None] = {}
+_cache: AnalysisCache | None = None
+
+
+def _init_worker(wordlists: list[str],
+                 backend: str) -> None:
+    """
+    Initializes a worker process by loading the word indexes. With fork they are inherited from the server process.
+
+    :param wordlists: Paths to the wordlists.
+    :param backend: The backend of the word indexes.
+    :return: None
+    """
+
+    global _cache
+    for wordlist in wordlists:
+        _indexes[wordlist] = load_word_index(wordlist, backend)
+
+    _cache = AnalysisCache()
+
+
+def _analyze(wordlist: str,
+             d_progress_word: str,
+             d_wrong_guessed: list[str],
+             method: str,
+             candidates: int) -> tuple[int, list[list[str, int | float]], list[str]]:
+    """
+    Analyzes a state in a worker process.
+
+    :param wordlist: Path to the wordlist.
+    :param d_progress_word: The word with the already guessed letters and underscores as not-guessed letters.
+    :param d_wrong_guessed: A list of all wrong guessed letters.
+    :param method: Name of a registered strategy.
+    :param candidates: Maximum number of candidates to return.
+    :return: The number of candidates, the letter ranking and the first candidates.
+    """
+
+    index = _indexes[wordlist]
+    if (wordlist, method) not in _books:
+        _books[wordlist, method] = find_opening_book(index, method)
+
+    book = _books[wordlist, method]
+    opening = book.lookup(d_progress_word, d_wrong_guessed) if book is not None else None
+    if opening is not None and candidates == 0:
+        return opening[0], opening[1], []
+
+    key = _cache.get_key(d_progress_word, d_wrong_guessed, index, method)
+    cached = _cache.get(key)
+    if cached is not None:
+        count, letters = cached
+        possible_words = LazyWordList(index, d_progress_word, d_wrong_guessed, count) if candidates > 0 else []
+        return count, letters, list(possible_words[:candidates])
+
+    state = GameState(index, len(d_progress_word))
+    state.update(d_progress_word, d_wrong_guessed)
+    possible_words, letters = state.analyze(method)
+    _cache.put(key, (len(possible_words), letters))
+    return len(possible_words), letters, list(possible_words[:candidates])
+
+
+def check_request(request: dict) -> None:
+    """
+    Checks the types of the fields of a request.
+
+    :param request: The request.
+    :return: None
+    :raises TypeError: If a field has another type.
+    """
+
+    for field, types in REQUEST_FIELDS.items():
+        value = request.get(field)
+        # JSON booleans are ints in Python, but never a valid value
+        if value is not None and (isinstance(value, bool) or not isinstance(value, types)):
+            raise TypeError(f'The field {field} has to be a {" or ".join(t.__name__ for t in types)}.')
+
+    if isinstance(request.get('wrong_guessed'), list) \
+            and not all(isinstance(letter, str) for letter in request['wrong_guessed']):
+        raise TypeError('The field wrong_guessed has to be a list of letters.')
+
+
+# Classes
+class GuessingServer:
+    """
+    An asyncio server that answers states with the analysis of the bot.
+
+    Clients send one JSON object per line, e.g.
+    {"progress_word": "h_ll_", "wrong_guessed": ["a"], "wordlist": "english", "method": 1, "candidates": 10}
+    and get one JSON object per line back, with the number of candidates, the best letters and optionally the first
+    candidates. The analysis runs in worker processes that hold the preloaded word indexes. Identical states that are
+    requested at the same time are only analyzed once.
+    """
+
+    def __init__(self, wordlists: list[str],
+                 backend: str = 'python',
+                 processes: int = 1,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 top: int = 5) -> None:
+        """
+        :param wordlists: Paths to the wordlists the server answers for. The first one is the default.
+        :param backend: The backend of the word indexes.
+        :param processes: Number of worker processes.
+        :param timeout: Seconds a request may take if it doesn't set its own deadline.
+        :param top: Number of letters returned if the request doesn't set it.
+        """
+
+        self.wordlists = [os.path.abspath(find_wordlist(wordlist)) for wordlist in wordlists]
+        self.timeout = timeout
+        self.top = top
+        # Load the indexes before the workers start, so forked workers inherit them
+        for wordlist in self.wordlists:
+            load_word_index(wordlist, backend)
+
+        self.executor = ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(self.wordlists, backend))
+        # Start the workers before clients connect, forked workers would otherwise keep the sockets of the connected
+        # clients open after the server closed them
+        self.executor.submit(os.getpid).result()
+        # Analyses that are currently running, keyed by the wordlist, the method, the state and the candidates
+        self.in_flight: dict[tuple[str, str, str, int], asyncio.Future] = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    def get_wordlist(self, name: str | None) -> str:
+        """
+        Returns the path of a requested wordlist.
+
+        :param name: Path or language of the wordlist. None for the default wordlist.
+        :return: The absolute path of the wordlist.
+        """
+
+        if name is None:
+            return self.wordlists[0]
+
+        path = LANGUAGES.get(name.lower(), name)
+        if os.path.exists(path):
+            path = find_wordlist(path)
+
+        path = os.path.abspath(path)
+        if path not in self.wordlists:
+            raise ValueError(f'Wordlist {name} is not served.')
+
+        return path
+
+    async def answer(self, request: dict) -> dict:
+        """
+        Answers one request.
+
+        :param request: The request.
+        :return: The response.
+        """
+
+        check_request(request)
+        progress_word = request.get('progress_word')
+        wrong_guessed = request.get('wrong_guessed', [])
+        if isinstance(wrong_guessed, str):
+            wrong_guessed = wrong_guessed.split(',')
+        if not isinstance(progress_word, str) or not progress_word or not isinstance(wrong_guessed, list):
+            raise ValueError('The request needs a progress_word and a list of wrong_guessed letters.')
+
+        progress_word = progress_word.lower()
+        wrong_guessed = [letter.lower() for letter in wrong_guessed if letter != '']
+        # Strategies can be requested by their name or their number
+        method = get_strategy(request.get('method', 1)).name
+
+        wordlist = self.get_wordlist(request.get('wordlist'))
+        candidates = max(0, int(request.get('candidates', 0)))
+        top = int(request.get('top', self.top))
+        timeout = float(request.get('timeout', self.timeout))
+
+        key = (wordlist, method, get_state_key(progress_word, wrong_guessed), candidates)
+        future = self.in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, _analyze, wordlist, progress_word, wrong_guessed, method,
+                                          candidates)
+            self.in_flight[key] = future
+            future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+            instrumentation.count('server_coalesced')
+
+        # The analysis keeps running for other requests of the same state if this one times out
+        count, letters, words = await asyncio.wait_for(asyncio.shield(future), timeout)
+        response = {'count': count, 'letters': letters[:top]}
+        if candidates:
+            response['candidates'] = words
+
+        return response
+
+    async def handle_client(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+        """
+        Answers the requests of one client, one JSON object per line.
+
+        :param reader: Stream of the requests.
+        :param writer: Stream of the responses.
+        :return: None
+        """
+
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+
+                self.requests += 1
+                instrumentation.count('server_requests')
+                request = {}
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError('A request has to be a JSON object.')
+                    with instrumentation.timed('request'):
+                        response = await self.answer(request)
+                except asyncio.TimeoutError:
+                    instrumentation.count('server_timeouts')
+                    response = {'error': 'Deadline exceeded.'}
+                except (ValueError, TypeError) as error:
+                    response = {'error': str(error)}
+                except Exception as error:
+                    # E.g. a broken worker pool, the client gets an answer and the connection stays open
+                    instrumentation.count('server_errors')
+                    response = {'error': f'Internal error: {type(error).__name__}.'}
+
+                if 'id' in request:
+                    response['id'] = request['id']
+
+                writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST,
+                    port: int = DEFAULT_PORT,
+                    unix_path: str | None = None) -> None:
+        """
+        Serves clients over TCP or, if a path is given, over a Unix socket until the server is stopped.
+
+        :param host: Host of the TCP server.
+        :param port: Port of the TCP server.
+        :param unix_path: Path of the Unix socket.
+        :return: None
+        """
+
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle_client, unix_path)
+            print(f'Serving on [cyan]{unix_path}[/cyan].')
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+            print(f'Serving on [cyan]{host}:{port}[/cyan].')
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """
+        Stops the worker processes.
+
+        :return: None
+        """
+
+        self.executor.shutdown(cancel_futures=True)
+
+
+def start_dialog(args: list[str]) -> None:
+    """
+    Starts the server with the options given on the command line.
+
+    :param args: Command line arguments
+    :type args: list[str]
+    :return:
+    :rtype: None
+    """
+
+    if '-h' in args:
+        print('Usage: python3 server.py [-w wordlist-path ...] [-H host] [-p port] [-u socket-path] [-b backend] '
+              '[-mp processes] [-t timeout] [--metrics metrics-path] [--profile mode]')
+        print('[bright_green]Options:')
+        print('[cyan]-w:[/cyan] Wordlist to serve, can be given more than once (default: English and German)')
+        print(f'[cyan]-H:[/cyan] Host (default: {DEFAULT_HOST})')
+        print(f'[cyan]-p:[/cyan] Port (default: {DEFAULT_PORT})')
+        print('[cyan]-u:[/cyan] Serve on a Unix socket instead of TCP')
+        print('[cyan]-b:[/cyan] Backend for the word analysis (python/numpy)')
+        print('[cyan]-mp:[/cyan] Number of worker processes (default: 1)')
+        print(f'[cyan]-t:[/cyan] Seconds a request may take (default: {DEFAULT_TIMEOUT})')
+        print('[cyan]--metrics:[/cyan] Save request timings and counters of the server process on exit (JSON, or '
+              'Prometheus text for .prom)')
+        print('[cyan]--profile:[/cyan] Profile the server process with cprofile or tracemalloc, optionally saved with '
+              'mode:path')
+        quit()
+
+    wordlists = [args[i + 1] for i, arg in enumerate(args[:-1]) if arg == '-w']
+    if not wordlists:
+        wordlists = [find_wordlist(LANGUAGES['english']), find_wordlist(LANGUAGES['german'])]
+    for wordlist in wordlists:
+        if not os.path.exists(wordlist):
+            print(f'[italic red]Wordlist {wordlist} not found.')
+            quit()
+
+    host = args[args.index('-H') + 1] if '-H' in args else DEFAULT_HOST
+    port = int(args[args.index('-p') + 1]) if '-p' in args else DEFAULT_PORT
+    unix_path = args[args.index('-u') + 1] if '-u' in args else None
+    backend = args[args.index('-b') + 1] if '-b' in args else 'python'
+    processes = int(args[args.index('-mp') + 1]) if '-mp' in args else 1
+    timeout = float(args[args.index('-t') + 1]) if '-t' in args else DEFAULT_TIMEOUT
+    if backend not in BACKENDS:
+        print('[italic red]Backend not supported.')
+        quit()
+    elif backend == 'numpy' and np is None:
+        print('[italic red]The numpy backend requires numpy to be installed.')
+        quit()
+
+    instrumentation.configure(args)
+    server = GuessingServer(wordlists, backend, processes, timeout)
+    try:
+        asyncio.run(server.serve(host, port, unix_path))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    start_dialog(sys.argv)
@@ -0,0 +1,142 @@
+# Import libraries
+import time
+from collections import defaultdict
+
+from game import MAX_WRONG_GUESSES
+from openings import OpeningBook
+from tools import apply_pattern, get_strategy, load_word_index, rank_candidates, np, Strategy, WordBucket, WordIndex
+
+
+# Functions
+def get_secret_patterns(secrets: 'list[str] | np.ndarray',
+                        games: 'list[int] | np.ndarray',
+                        letter: str,
+                        bucket: WordBucket) -> 'list[int] | np.ndarray':
+    """
+    Returns the pattern a letter reveals in the word of each game.
+
+    :param secrets: The words of all games, as strings or as a matrix of letter codes for numpy.
+    :param games: Indices of the games.
+    :param letter: The guessed letter.
+    :param bucket: The bucket of the words.
+    :return: For each game, the bitmask of the positions of the letter (bit i for position i), 0 for a miss.
+    """
+
+    if np is not None and isinstance(secrets, np.ndarray):
+        code = bucket.letter_codes.get(letter, -1)
+        weights = 1 << np.arange(bucket.length, dtype=np.int64)
+        return (secrets[games] == code) @ weights
+
+    return [sum(1 << pos for pos, char in enumerate(secrets[game]) if char == letter) for game in games]
+
+
+def simulate_batch(words: list[str],
+                   wordlist: str | WordIndex,
+                   strategy: str | int | Strategy = 1,
+                   max_wrong_guesses: int = MAX_WRONG_GUESSES,
+                   book: OpeningBook | None = None,
+                   stats: dict[str, int | float] | None = None) -> list[tuple[bool, int]]:
+    """
+    Lets the bot play many games at once and returns the same results as playing every word with play_word.
+
+    All games of the same word length advance together, one guess per step. Games that are in the same state share
+    their candidates (rows of the length bucket) and their analysis, so every state is only filtered and analyzed
+    once per step, no matter how many games are in it. The revealed patterns of all games of a state are computed in
+    one vectorized operation and split the games into the states of the next step.
+
+    :param words: The words to play.
+    :param wordlist: Path to the wordlist or a loaded word index.
+    :param strategy: Name or number of a registered strategy.
+    :param max_wrong_guesses: Number of wrong guesses the bot may make without losing.
+    :param book: Optional opening book of the method for the wordlist.
+    :param stats: Optional dictionary that the number of decisions (analyzed states) and the time they took in seconds
+                  are added to, as 'decisions' and 'decision_time'.
+    :return: For each word, whether the bot won and the number of wrong guesses.
+    """
+
+    index = load_word_index(wordlist)
+    strategy = get_strategy(strategy)
+    if book is not None and get_strategy(book.method) is not strategy:
+        book = None
+
+    decisions = 0
+    decision_time = 0.0
+    results: list[tuple[bool, int]] = [(False, 0)] * len(words)
+    games_by_length: dict[int, list[int]] = defaultdict(list)
+    for game, word in enumerate(words):
+        games_by_length[len(word)].append(game)
+
+    for length, length_games in games_by_length.items():
+        if length not in index.bucket_sizes:
+            # Every guess of the bot misses, because it doesn't know any word of that length
+            for game in length_games:
+                results[game] = (False, max_wrong_guesses + 1)
+            continue
+
+        bucket = index.get_encoded_bucket(length)
+        secrets = [words[game].lower() for game in length_games]
+        if bucket.backend == 'numpy':
+            # Letter codes of the words, letters outside the alphabet of the index never match
+            secrets = np.array([[bucket.letter_codes.get(char, 255) for char in word] for word in secrets],
+                               dtype=np.uint8).reshape(len(secrets), length)
+            games = np.arange(len(length_games))
+        else:
+            games = list(range(len(length_games)))
+
+        # Active states: progress word, wrong guessed letters, rows of the candidates and the games in the state
+        states = [('_' * length, [], bucket.filter('_' * length, []), games)]
+        while states:
+            next_states = []
+            for progress_word, wrong_guessed, rows, state_games in states:
+                start_time = time.perf_counter()
+                guessed_letters = list(set(char for char in progress_word if char != '_')) + wrong_guessed
+                opening = book.lookup(progress_word, wrong_guessed) if book is not None else None
+                letters = opening[1] if opening is not None else \
+                    rank_candidates(bucket, rows, guessed_letters, strategy)
+                decision_time += time.perf_counter() - start_time
+                decisions += 1
+                if not letters:
+                    # Every letter was guessed without solving the word
+                    for game in state_games:
+                        results[length_games[game]] = (False, len(wrong_guessed))
+                    continue
+
+                letter = letters[0][0]
+                # Group the games by the pattern the letter reveals in their word
+                patterns = get_secret_patterns(secrets, state_games, letter, bucket)
+                if isinstance(patterns, list):
+                    groups: dict[int, list[int]] = defaultdict(list)
+                    for game, pattern in zip(state_games, patterns):
+                        groups[pattern].append(game)
+                    groups = groups.items()
+                else:
+                    unique_patterns, inverse = np.unique(patterns, return_inverse=True)
+                    groups = ((int(pattern), state_games[inverse == i]) for i, pattern in enumerate(unique_patterns))
+
+                for pattern, group in groups:
+                    if pattern == 0:
+                        next_progress_word, next_wrong_guessed = progress_word, wrong_guessed + [letter]
+                    else:
+                        next_progress_word = apply_pattern(progress_word, letter, pattern)
+                        next_wrong_guessed = wrong_guessed
+
+                    if '_' not in next_progress_word or len(next_wrong_guessed) > max_wrong_guesses:
+                        won = '_' not in next_progress_word
+                        for game in group:
+                            results[length_games[game]] = (won, len(next_wrong_guessed))
+                        continue
+
+                    next_rows = bucket.filter(next_progress_word, next_wrong_guessed, rows)
+                    next_states.append((next_progress_word, next_wrong_guessed, next_rows, group))
+
+            states = next_states
+
+    if stats is not None:
+        stats['decisions'] = stats.get('decisions', 0) + decisions
+        stats['decision_time'] = stats.get('decision_time', 0.0) + decision_time
+
+    return results
+
+
+if __name__ == '__main__':
+    print('This script is not meant to be run directly.')
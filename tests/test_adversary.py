@@ -0,0 +1,63 @@
+# Import libraries
+import os
+import unittest
+from unittest import mock
+
+import adversary
+from adversary import EvilHangman, LookaheadHangman
+from game import GameEngine, Modes
+from tools import load_word_index, np
+from tests.test_tools import write_wordlist
+
+
+class TestEvilHangman(unittest.TestCase):
+    def setUp(self) -> None:
+        self.words = ['bake', 'cake', 'lake', 'make', 'rake', 'take', 'bike', 'like', 'mike', 'hike']
+        self.wordlist = write_wordlist(self.words)
+
+    def tearDown(self) -> None:
+        os.remove(self.wordlist)
+
+    @unittest.skipIf(np is None, 'numpy is not installed')
+    def test_get_word_numpy(self) -> None:
+        # A text wordlist keeps the decoded words, so get_words converts the rows itself
+        game = EvilHangman(load_word_index(self.wordlist, 'numpy'))
+        for letter in 'xyz':
+            game.guess(letter)
+
+        self.assertIn(game.get_word(), self.words)
+
+    def test_length_without_words(self) -> None:
+        with self.assertRaisesRegex(ValueError, 'no words of length 99'):
+            EvilHangman(self.wordlist, 99)
+
+        engine = GameEngine(self.wordlist, Modes.IMPOSSIBLE)
+        with self.assertRaisesRegex(ValueError, 'no words of length 99'):
+            engine.new_game(length=99)
+
+
+class TestLookaheadHangman(unittest.TestCase):
+    def test_time_budget(self) -> None:
+        # A fake clock that only advances when the search filters candidates, so the test doesn't depend on the speed
+        # of the machine. A deep search on the whole english wordlist takes far more filters than the budget allows.
+        time_budget, filter_time = 0.05, 0.01
+        game = LookaheadHangman(load_word_index('Wordlists/wordlist_english.txt', 'python'), depth=3,
+                                time_budget=time_budget)
+        bucket = game.state.bucket
+        original_filter = bucket.filter
+        clock = [0.0]
+
+        def filter_rows(*args, **kwargs):
+            clock[0] += filter_time
+            return original_filter(*args, **kwargs)
+
+        with mock.patch.object(adversary.time, 'perf_counter', lambda: clock[0]), \
+                mock.patch.object(bucket, 'filter', filter_rows):
+            game.choose_pattern('e')
+
+        # The deadline is checked before every filter, so the move overruns the budget by at most one filter
+        self.assertGreater(clock[0], time_budget)
+        self.assertLessEqual(clock[0], time_budget + filter_time + 1e-9)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+# Import libraries
+import os
+import tempfile
+import unittest
+
+from analysis_cache import AnalysisCache
+from bot import Bot
+from tests.test_tools import write_wordlist
+
+
+class TestAnalysisCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.wordlist = write_wordlist(['bake', 'cake', 'lake', 'make', 'bike', 'like', 'mike', 'hike', 'rope'])
+
+    def tearDown(self) -> None:
+        os.remove(self.wordlist)
+
+    def test_bot_cache_hit(self) -> None:
+        cache = AnalysisCache()
+        possible_words, letters = Bot(self.wordlist, cache=cache).analyze('__ke', ['o'])
+        # Only the number of candidates and the ranking are cached
+        self.assertEqual(list(cache.entries.values()), [(len(possible_words), letters)])
+
+        cached_words, cached_letters = Bot(self.wordlist, cache=cache).analyze('__ke', ['o'])
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cached_letters, letters)
+        self.assertEqual(len(cached_words), len(possible_words))
+        self.assertEqual(list(cached_words), list(possible_words))
+
+    def test_multi_character_letters_are_rejected(self) -> None:
+        # ['ab'] and ['a', 'b'] would share a key
+        cache = AnalysisCache()
+        with self.assertRaises(ValueError):
+            Bot(self.wordlist, cache=cache).analyze('____', ['ab'])
+
+        self.assertEqual(len(cache), 0)
+
+    def test_disk_tier_is_invalidated_by_a_changed_wordlist(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            disk_path = os.path.join(directory, 'cache')
+            cache = AnalysisCache(disk_path=disk_path)
+            Bot(self.wordlist, cache=cache).analyze('__ke', [])
+            cache.close()
+
+            cache = AnalysisCache(disk_path=disk_path)
+            count = len(Bot(self.wordlist, cache=cache).analyze('__ke', [])[0])
+            self.assertEqual((cache.disk_hits, count), (1, 8))
+            cache.close()
+
+            # Cleaned again in place, the loaded index of this process is stale but the key isn't found on disk
+            with open(self.wordlist, 'a', encoding='utf-8') as file:
+                file.write('fake\n')
+
+            cache = AnalysisCache(disk_path=disk_path)
+            key = cache.get_key('__ke', [], self.wordlist)
+            self.assertIsNone(cache.get(key))
+            self.assertEqual(cache.misses, 1)
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
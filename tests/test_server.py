@@ -0,0 +1,61 @@
+# Import libraries
+import os
+import json
+import asyncio
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+
+from server import GuessingServer
+from tests.test_tools import write_wordlist
+
+
+class TestGuessingServer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.wordlist = write_wordlist(['bake', 'cake', 'lake', 'bike', 'like'])
+        self.server = GuessingServer([self.wordlist])
+
+    def tearDown(self) -> None:
+        self.server.close()
+        os.remove(self.wordlist)
+
+    async def send(self, requests: list[dict]) -> list[dict]:
+        """
+        Sends requests over one connection and returns the responses.
+
+        :param requests: The requests.
+        :return: The responses.
+        """
+
+        server = await asyncio.start_server(self.server.handle_client, '127.0.0.1', 0)
+        async with server:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            responses = []
+            for request in requests:
+                writer.write(json.dumps(request).encode('utf-8') + b'\n')
+                await writer.drain()
+                responses.append(json.loads(await reader.readline()))
+
+            writer.close()
+            await writer.wait_closed()
+            return responses
+
+    def test_invalid_fields_keep_the_connection_open(self) -> None:
+        responses = asyncio.run(self.send([{'progress_word': '__ke', 'wordlist': 5},
+                                           {'progress_word': '__ke', 'wrong_guessed': [1]},
+                                           {'progress_word': '__ke', 'wrong_guessed': ['i'], 'id': 3}]))
+        self.assertIn('wordlist', responses[0]['error'])
+        self.assertIn('wrong_guessed', responses[1]['error'])
+        self.assertEqual(responses[2]['count'], 3)
+        self.assertEqual(responses[2]['id'], 3)
+
+    def test_internal_errors_are_answered(self) -> None:
+        async def answer(request: dict) -> dict:
+            raise BrokenProcessPool
+
+        self.server.answer = answer
+        responses = asyncio.run(self.send([{'progress_word': '__ke'}, {'progress_word': '__ke'}]))
+        self.assertEqual(responses, [{'error': 'Internal error: BrokenProcessPool.'}] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
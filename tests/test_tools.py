@@ -0,0 +1,62 @@
+# Import libraries
+import os
+import tempfile
+import unittest
+
+from tools import get_possible_words, get_word_analysis_meth2, load_word_index, np, GameState
+
+
+def write_wordlist(words: list[str]) -> str:
+    """
+    Writes a temporary wordlist.
+
+    :param words: The words.
+    :return: Path to the wordlist.
+    """
+
+    file = tempfile.NamedTemporaryFile('w', suffix='.txt', encoding='utf-8', delete=False)
+    with file:
+        file.write('\n'.join(words) + '\n')
+
+    return file.name
+
+
+class TestInformationRanking(unittest.TestCase):
+    def setUp(self) -> None:
+        self.wordlist = write_wordlist(['häute', 'heute', 'hüten', 'laute', 'leute'])
+
+    def tearDown(self) -> None:
+        os.remove(self.wordlist)
+
+    def test_one_candidate_ranks_its_letters_first(self) -> None:
+        for backend in ['python', 'numpy'] if np is not None else ['python']:
+            with self.subTest(backend=backend):
+                words, letters = get_word_analysis_meth2('h_u_e', ['a', 'i', 'o'],
+                                                         load_word_index(self.wordlist, backend))
+                self.assertEqual(words, ['häute'])
+                self.assertEqual(sorted(letter for letter, _ in letters[:2]), ['t', 'ä'])
+                self.assertTrue(all(information == 0.0 for _, information in letters))
+
+
+
+class TestGameState(unittest.TestCase):
+    def setUp(self) -> None:
+        self.wordlist = write_wordlist(['alpha', 'arena', 'asked', 'amber', 'araby', 'apple'])
+
+    def tearDown(self) -> None:
+        os.remove(self.wordlist)
+
+    def test_revealing_a_guessed_letter_again_refilters(self) -> None:
+        # A corrected input reveals the same letter at another position, which no further guess can do
+        state = GameState(self.wordlist, 5)
+        state.update('a____', [])
+        self.assertEqual(sorted(state.candidates), ['amber', 'apple', 'asked'])
+        self.assertFalse(state.is_refinement('a_a__', []))
+
+        state.update('a_a__', [])
+        self.assertEqual(state.candidates, ['araby'])
+        self.assertEqual(state.candidates, get_possible_words('a_a__', [], load_word_index(self.wordlist)))
+
+
+if __name__ == '__main__':
+    unittest.main()
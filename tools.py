@@ -1,10 +1,30 @@
 # Import libraries
 import os
 import math
-import time
+import mmap
+import heapq
+import shutil
+import struct
+import tempfile
+import unicodedata
 from rich import print
 from rich.traceback import install
-from multiprocessing import Pool, cpu_count
+from collections import Counter
+from typing import BinaryIO, Callable, Iterable, Iterator, Sequence, TYPE_CHECKING
+from itertools import islice
+from functools import cached_property, reduce
+from operator import or_
+
+from instrumentation import instrument, observe, timed
+
+if TYPE_CHECKING:
+    # Only for the annotations, analysis_pool imports this module
+    from analysis_pool import AnalysisPool
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 install()
@@ -15,6 +35,15 @@ ALPHABET: list[str] = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l
 NUMBERS: list[str] = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']
 SPECIAL_CHARS: list[str] = ['!', '.', ',', '^', '°', '#', '&', '*', '/', '\\', '|', ':', ';',
                             '\'', '$', '%', '"', '<', '>', '~', '`', '(', ')', '-', '+', '?']
+BACKENDS: list[str] = ['python', 'numpy']
+# Compiled wordlist format
+WORDFILE_MAGIC: bytes = b'HMWL'
+WORDFILE_VERSION: int = 1
+WORDFILE_EXTENSION: str = '.bin'
+WORDFILE_HEADER: str = '<4sHHH'
+WORDFILE_BUCKET: str = '<HIQQ'
+# Weight of the words a hit eliminates in the positional letter frequency (method 3)
+POSITION_WEIGHT: float = 0.3
 
 
 # Functions
@@ -45,34 +74,116 @@ def get_new_progress_word(d_progress_word: str,
     return new_progress_word
 
 
+def apply_pattern(d_progress_word: str,
+                  d_letter: str,
+                  pattern: int) -> str:
+    """
+    Returns the progress word with the letter revealed at the positions of a pattern.
+
+    :param d_progress_word: Current progress word.
+    :param d_letter: Guessed letter.
+    :param pattern: Bitmask of the positions of the letter (bit i for position i), 0 for a miss.
+    :return: The new progress word.
+    """
+
+    return ''.join(d_letter if pattern >> pos & 1 else char for pos, char in enumerate(d_progress_word))
+
+
+def read_lines(wordlist_path: str) -> Iterator[str]:
+    """
+    Streams the lines of a text wordlist without reading the whole file into memory.
+
+    :param wordlist_path: Path to the wordlist.
+    :return: The stripped lines. Bytes that aren't valid UTF-8 are replaced, so the word fails the validation.
+    """
+
+    with open(wordlist_path, 'r', encoding='utf-8', errors='replace') as file:
+        for line in file:
+            yield line.strip()
+
+
+def normalize_words(d_words: Iterable[str]) -> Iterator[str]:
+    """
+    Normalizes words to lowercase NFC, so e.g. a decomposed "ü" is the same letter as a composed one.
+
+    :param d_words: The words.
+    :return: The normalized words.
+    """
+
+    for word in d_words:
+        yield unicodedata.normalize('NFC', word).lower()
+
+
+def validate_words(d_words: Iterable[str],
+                   alphabet: Iterable[str] = ALPHABET) -> Iterator[str]:
+    """
+    Drops empty words and words with characters outside the alphabet (digits, whitespace, special characters, ...).
+
+    :param d_words: The words.
+    :param alphabet: The valid letters.
+    :return: The valid words.
+    """
+
+    alphabet = frozenset(alphabet)
+    for word in d_words:
+        if word and alphabet.issuperset(word):
+            yield word
+
+
+def dedupe_words(d_words: Iterable[str],
+                 run_size: int | None = None) -> Iterator[str]:
+    """
+    Drops duplicate words.
+
+    By default the seen words are kept in a hash set and the order of the words is kept. For inputs with more unique
+    words than fit into memory, an external sort can be used instead: sorted runs of run_size words are written to
+    temporary files and merged, and the words come out sorted.
+
+    :param d_words: The words.
+    :param run_size: Number of words per sorted run. None uses a hash set.
+    :return: The unique words.
+    """
+
+    if run_size is None:
+        seen: set[str] = set()
+        for word in d_words:
+            if word not in seen:
+                seen.add(word)
+                yield word
+        return
+
+    with tempfile.TemporaryDirectory(prefix='hangman_') as run_dir:
+        run_paths = []
+        words = iter(d_words)
+        while run := sorted(set(islice(words, run_size))):
+            run_paths.append(os.path.join(run_dir, f'{len(run_paths)}.txt'))
+            with open(run_paths[-1], 'w', encoding='utf-8') as file:
+                file.writelines(word + '\n' for word in run)
+
+        runs = [open(path, 'r', encoding='utf-8') for path in run_paths]
+        try:
+            last_word = None
+            for line in heapq.merge(*runs):
+                word = line.rstrip('\n')
+                if word != last_word:
+                    last_word = word
+                    yield word
+        finally:
+            for run in runs:
+                run.close()
+
+
 def remove_non_valid(filepath: str,
                      filename: str) -> None:
     """
-    Removes all non-valid words from the file containing all words.
+    Removes all non-valid words from the file containing all words and compiles it (see preprocess_wordlist).
 
     :param filepath: Path to the wordlist
     :param filename: name of the file
     :return: None
     """
 
-    global SPECIAL_CHARS
-
-    # Open wordlist file and creating a temp file
-    with open(filepath + filename, 'r', encoding='utf-8') as source_file, \
-            open(filepath + 'temp.txt', 'w', encoding='utf-8') as temp_file:
-
-        # Cycle through all lines (words)
-        for line in source_file:
-            word: str = line.strip()
-
-            # Check if word is valid
-            if not any(char.isdigit() or char.isspace() or char in SPECIAL_CHARS or ord(char) > 127 for char in word):
-                # Add the word to the temp file
-                temp_file.write(line)
-
-    # Replace the old wordlist by deleting the wordlist and renaming the temp file to the name of the wordlist file
-    os.remove(filepath + filename)
-    os.rename(filepath + 'temp.txt', filename)
+    preprocess_wordlist(os.path.join(filepath, filename))
 
 
 def get_average(d_nums: list[int | float | list[int | float, ...]],
@@ -100,6 +211,40 @@ def get_average(d_nums: list[int | float | list[int | float, ...]],
     return average
 
 
+def get_percentile(d_nums: Iterable[int | float],
+                   percent: int | float) -> float:
+    """
+    Calculates a percentile with the nearest-rank method, e.g. the 95th percentile of the wrong guesses.
+
+    :param d_nums: The numbers.
+    :param percent: The percentile, between 0 and 100.
+    :return: The smallest number that is greater than or equal to the given percentage of the numbers.
+    """
+
+    numbers = sorted(d_nums)
+    if not numbers:
+        return 0.0
+
+    rank = max(1, math.ceil(percent / 100 * len(numbers)))
+    return numbers[rank - 1]
+
+
+def get_entropy(d_sizes: Iterable[int]) -> float:
+    """
+    Calculates the entropy in bits of a partition, given the sizes of its groups.
+
+    :param d_sizes: The sizes of the groups.
+    :return: The entropy in bits.
+    """
+
+    sizes = [size for size in d_sizes if size > 0]
+    total = sum(sizes)
+    if total == 0:
+        return 0.0
+
+    return math.log2(total) - sum(size * math.log2(size) for size in sizes) / total
+
+
 def txt2list(filename: str) -> list[str]:
     """
     Turns a text file into a list by separating each line.
@@ -118,29 +263,716 @@ def txt2list(filename: str) -> list[str]:
     return db
 
 
-# Currently unused
-def get_letter_averages(d_words: list[str]) -> list[list[str | float]]:
+def count_patterns(d_words: Iterable[Sequence],
+                   symbols: Iterable) -> dict:
     """
-    Returns a list of letters with their occurrences sorted by the occurrence.
+    Groups words by the pattern each symbol would reveal in them, in a single pass over the words.
 
-    :param d_words: A list of words to fo through.
-    :return:
+    A pattern is a bitmask of the positions of the symbol in the word (bit i for position i), so 0 means the
+    symbol is not in the word.
+
+    :param d_words: The words, as strings or as rows of letter codes.
+    :param symbols: The letters or letter codes to group the words by.
+    :return: For each symbol, the number of words per pattern.
     """
 
-    global ALPHABET
+    pattern_counts: Counter = Counter()
+    total = 0
+    for word in d_words:
+        patterns: dict = {}
+        for pos, symbol in enumerate(word):
+            patterns[symbol] = patterns.get(symbol, 0) | 1 << pos
 
-    averages = []
-    # Cycle through the alphabet
-    for letter in ALPHABET:
-        letter_counts: list[int] = []
-        # Counts in how many words the current letter is found
-        for word in d_words:
+        pattern_counts.update(patterns.items())
+        total += 1
+
+    partitions: dict = {symbol: {} for symbol in symbols}
+    for (symbol, pattern), count in pattern_counts.items():
+        if symbol in partitions:
+            partitions[symbol][pattern] = count
+
+    # Words without the symbol
+    for partition in partitions.values():
+        hits = sum(partition.values())
+        if hits < total:
+            partition[0] = total - hits
+
+    return partitions
+
+
+def count_patterns_numpy(matrix: 'np.ndarray',
+                         codes: Iterable[int]) -> dict[int, dict[int, int]]:
+    """
+    Numpy version of count_patterns for a matrix of letter codes with one row per word.
+
+    :param matrix: The letter codes of the words.
+    :param codes: The letter codes to group the words by.
+    :return: For each letter code, the number of words per pattern.
+    """
+
+    position_bits = 1 << np.arange(matrix.shape[1], dtype=np.int64)
+    partitions: dict[int, dict[int, int]] = {}
+    for code in codes:
+        values, counts = np.unique((matrix == code) @ position_bits, return_counts=True)
+        partitions[code] = dict(zip(values.tolist(), counts.tolist()))
+
+    return partitions
+
+
+class WordBucket:
+    """
+    All words of one length, encoded over the alphabet of their word index.
+
+    Every word gets a row of letter codes. The python backend adds a letter-set bitmask (bit i is set
+    if the word contains alphabet[i]) and a positional encoding in which position p occupies the bits
+    p * width to (p + 1) * width - 1 and only the bit of the letter at that position is set, so
+    filtering a word by a progress word boils down to a single integer AND. The numpy backend stores
+    the letter codes as a uint8 matrix plus a boolean letter-presence matrix instead.
+    """
+
+    def __init__(self, length: int,
+                 codes: bytes | memoryview,
+                 letter_codes: dict[str, int],
+                 backend: str = 'python',
+                 words: list[str] | None = None,
+                 masks: bytes | memoryview | None = None) -> None:
+        """
+        :param length: Length of the words.
+        :param codes: Letter codes of all words, one row of "length" bytes per word.
+        :param letter_codes: Code of every letter of the alphabet.
+        :param backend: The backend, 'python' or 'numpy'.
+        :param words: The words, if they are already known. Otherwise they are decoded from the codes when needed.
+        :param masks: Letter-set bitmasks of all words, "stride" bytes per word, if they are already known.
+        """
+
+        self.length = length
+        self.count = len(codes) // length if length else 0
+        self.codes = codes
+        self.letter_codes = letter_codes
+        self.backend = backend
+        self._words = words
+        self._decode_table = str.maketrans({chr(code): letter for letter, code in letter_codes.items()})
+
+        # Bits per position, rounded up to whole bytes so the encoding can be built with str.translate
+        self.stride = (len(letter_codes) + 7) // 8
+        self.width = self.stride * 8
+
+        self.masks: list[int] = []
+        self.positions: list[int] = []
+        # Distinct letter codes of every word, built on first use
+        self._letter_sets: list[str] | None = None
+        # Letter counts per position of the whole bucket, built on first use
+        self._position_counts: list[list[int]] | None = None
+        self.matrix = None
+        self.presence = None
+        if backend == 'numpy':
+            self.matrix = np.frombuffer(codes, dtype=np.uint8).reshape(self.count, length)
+            if masks is not None:
+                mask_matrix = np.frombuffer(masks, dtype=np.uint8).reshape(self.count, self.stride)
+                self.presence = np.unpackbits(mask_matrix, axis=1, bitorder='little')[:, :len(letter_codes)] \
+                    .astype(bool)
+            else:
+                self.presence = np.zeros((self.count, len(letter_codes)), dtype=bool)
+                self.presence[np.arange(self.count)[:, None], self.matrix] = True
+        else:
+            # Work on the letter codes as latin-1 strings, so str.translate does the per-letter lookups
+            code_string = bytes(codes).decode('latin-1')
+            rows = [code_string[i:i + length] for i in range(0, len(code_string), length)] if length else []
+            code_bits = {chr(code): 1 << code for code in letter_codes.values()}
+            one_hot_table = str.maketrans({chr(code): (1 << code).to_bytes(self.stride, 'little').decode('latin-1')
+                                           for code in letter_codes.values()})
+
+            if masks is not None:
+                stride = self.stride
+                self.masks = [int.from_bytes(masks[i * stride:(i + 1) * stride], 'little') for i in range(self.count)]
+            else:
+                self.masks = [reduce(or_, map(code_bits.__getitem__, set(row)), 0) for row in rows]
+            self.positions = [int.from_bytes(row.translate(one_hot_table).encode('latin-1'), 'little') for row in rows]
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def words(self) -> list[str]:
+        if self._words is None:
+            words = bytes(self.codes).decode('latin-1').translate(self._decode_table)
+            self._words = [words[i:i + self.length] for i in range(0, len(words), self.length)] if self.length else []
+
+        return self._words
+
+    def get_words(self, rows: 'list[int] | range | np.ndarray') -> list[str]:
+        """
+        Returns the words of the given rows.
+
+        :param rows: Rows of the words.
+        :return: A list of words.
+        """
+
+        if self.backend == 'numpy':
+            if self._words is None:
+                # Only decode the requested rows
+                words = self.matrix[rows].tobytes().decode('latin-1').translate(self._decode_table)
+                return [words[i:i + self.length] for i in range(0, len(words), self.length)]
+
+            # Rows can also be given as a list, e.g. by the adversary
+            rows = np.asarray(rows).tolist()
+
+        words = self.words
+        return [words[row] for row in rows]
+
+    def get_mask_bytes(self) -> bytes:
+        """
+        Returns the letter-set bitmasks of all words, "stride" bytes per word.
+
+        :return: The bitmasks.
+        """
+
+        if self.backend == 'numpy':
+            mask_matrix = np.packbits(self.presence, axis=1, bitorder='little')
+            padding = self.stride - mask_matrix.shape[1]
+            return np.pad(mask_matrix, ((0, 0), (0, padding))).tobytes()
+
+        return b''.join(mask.to_bytes(self.stride, 'little') for mask in self.masks)
+
+    def get_letter_mask(self, letters: Iterable[str]) -> int:
+        """
+        Returns the letter-set bitmask of the given letters. Letters outside the alphabet are ignored.
+
+        :param letters: The letters.
+        :return: The bitmask.
+        """
+
+        mask = 0
+        for letter in letters:
+            if letter in self.letter_codes:
+                mask |= 1 << self.letter_codes[letter]
+
+        return mask
+
+    @instrument('filter')
+    def filter(self, d_progress_word: str,
+               d_wrong_guessed: list[str],
+               rows: 'list[int] | np.ndarray | None' = None) -> 'list[int] | np.ndarray':
+        """
+        Returns the rows of all words that match the progress word and contain none of the wrong guessed letters.
+
+        :param d_progress_word: The word with the already guessed letters and underscores as not-guessed letters.
+        :param d_wrong_guessed: A list of all wrong guessed letters.
+        :param rows: Rows to filter. If None, the whole bucket is filtered.
+        :return: The rows of the matching words, as a list or as an array for the numpy backend.
+        """
+
+        revealed = set(char for char in d_progress_word if char != '_')
+        if len(d_progress_word) != self.length or any(letter not in self.letter_codes for letter in revealed):
+            return np.empty(0, dtype=np.intp) if self.backend == 'numpy' else []
+
+        if self.backend == 'numpy':
+            return self._filter_numpy(d_progress_word, revealed | set(d_wrong_guessed), rows)
+
+        # Letters that mustn't appear in any unrevealed position
+        excluded = self.get_letter_mask(revealed) | self.get_letter_mask(d_wrong_guessed)
+
+        # "check" selects the bits that are tested, "must" is the value they need to have
+        must = 0
+        check = 0
+        for pos, char in enumerate(d_progress_word):
+            shift = pos * self.width
+            if char == '_':
+                check |= excluded << shift
+            else:
+                bit = 1 << (shift + self.letter_codes[char])
+                must |= bit
+                check |= bit
+
+        positions = self.positions
+        if rows is None:
+            return [row for row, encoded in enumerate(positions) if encoded & check == must]
+
+        return [row for row in rows if positions[row] & check == must]
+
+    def _filter_numpy(self, d_progress_word: str,
+                      excluded_letters: set[str],
+                      rows: 'np.ndarray | None') -> 'np.ndarray':
+        """
+        Numpy version of filter.
+
+        :param d_progress_word: The word with the already guessed letters and underscores as not-guessed letters.
+        :param excluded_letters: Letters that mustn't appear in any unrevealed position.
+        :param rows: Rows to filter. If None, the whole bucket is filtered.
+        :return: The rows of the matching words.
+        """
+
+        if rows is None:
+            rows = np.arange(self.count)
+        matrix = self.matrix[rows]
+
+        # Lookup table of all letter codes that are not allowed in unrevealed positions
+        excluded = np.zeros(len(self.letter_codes), dtype=bool)
+        excluded[[self.letter_codes[letter] for letter in excluded_letters if letter in self.letter_codes]] = True
+
+        unrevealed = [pos for pos, char in enumerate(d_progress_word) if char == '_']
+        keep = ~excluded[matrix[:, unrevealed]].any(axis=1)
+        for pos, char in enumerate(d_progress_word):
+            if char != '_':
+                keep &= matrix[:, pos] == self.letter_codes[char]
+
+        return rows[keep]
+
+    def get_letter_counts(self, rows: 'list[int] | range | np.ndarray | None' = None) -> list[int]:
+        """
+        Returns in how many of the given words each letter of the alphabet appears.
+
+        The numpy backend sums the presence matrix. The python backend keeps the letter set of every word as a string
+        of its distinct letter codes, so the counts are one str.count per letter over the joined letter sets.
+
+        :param rows: Rows of the words. If None, all words are counted.
+        :return: The number of words containing each letter, indexed by letter code.
+        """
+
+        if self.backend == 'numpy':
+            presence = self.presence if rows is None else self.presence[rows]
+            return presence.sum(axis=0).tolist()
+
+        if self._letter_sets is None:
+            code_string = bytes(self.codes).decode('latin-1')
+            self._letter_sets = [''.join(dict.fromkeys(code_string[i:i + self.length]))
+                                 for i in range(0, len(code_string), self.length)] if self.length else []
+
+        letter_sets = ''.join(self._letter_sets if rows is None else map(self._letter_sets.__getitem__, rows))
+        return [letter_sets.count(chr(code)) for code in range(len(self.letter_codes))]
+
+    def get_position_counts(self, rows: 'list[int] | range | np.ndarray | None' = None) -> list[list[int]]:
+        """
+        Returns how many of the given words have each letter at each position.
+        The counts of the whole bucket are computed once and kept, so the first guess of a game costs nothing.
+
+        :param rows: Rows of the words. If None, all words are counted.
+        :return: For each position, the number of words per letter code.
+        """
+
+        if rows is None and self._position_counts is not None:
+            return self._position_counts
+
+        size = len(self.letter_codes)
+        if self.backend == 'numpy':
+            matrix = self.matrix if rows is None else self.matrix[rows]
+            counts = [np.bincount(matrix[:, pos], minlength=size).tolist() for pos in range(self.length)]
+        else:
+            if rows is None:
+                code_string = bytes(self.codes).decode('latin-1')
+            else:
+                length = self.length
+                code_string = b''.join(self.codes[row * length:(row + 1) * length] for row in rows).decode('latin-1')
+            counts = []
+            for pos in range(self.length):
+                column = Counter(code_string[pos::self.length])
+                counts.append([column[chr(code)] for code in range(size)])
+
+        if rows is None:
+            self._position_counts = counts
+
+        return counts
+
+    def get_partitions(self, rows: 'list[int] | np.ndarray',
+                       letters: list[str]) -> dict[str, dict[int, int]]:
+        """
+        Groups the given words by the pattern each letter would reveal in them.
+
+        A pattern is a bitmask of the positions of the letter in the word (bit i for position i), so 0 means the
+        letter is not in the word.
+
+        :param rows: Rows of the words.
+        :param letters: The letters to group the words by.
+        :return: For each letter, the number of words per pattern.
+        """
+
+        codes = [self.letter_codes[letter] for letter in letters if letter in self.letter_codes]
+        if self.backend == 'numpy':
+            patterns = count_patterns_numpy(self.matrix[rows], codes)
+        else:
+            length = self.length
+            patterns = count_patterns((self.codes[row * length:(row + 1) * length] for row in rows), codes)
+
+        # Letters outside the alphabet are in none of the words
+        return {letter: patterns[self.letter_codes[letter]] if letter in self.letter_codes else {0: len(rows)}
+                for letter in letters}
+
+
+class WordIndex:
+    """
+    A wordlist that is loaded once, lowercased, deduplicated and bucketed by word length.
+
+    The wordlist can either be a text file with one word per line or a compiled wordlist (see compile_wordlist),
+    which is memory-mapped instead of parsed, so its pages are shared between processes.
+    """
+
+    def __init__(self, wordlist_path: str,
+                 backend: str = 'python') -> None:
+        if backend not in BACKENDS:
+            raise ValueError(f'Unknown backend {backend}. Choose one of {", ".join(BACKENDS)}.')
+        if backend == 'numpy' and np is None:
+            raise ImportError('The numpy backend requires numpy to be installed.')
+
+        self.wordlist_path = wordlist_path
+        self.backend = backend
+        self.is_compiled = is_compiled_wordlist(wordlist_path)
+        # Number of words, offset of the letter codes and offset of the bitmasks of each bucket in a compiled wordlist
+        self.layout: dict[int, tuple[int, int, int]] = {}
+        self._words: list[str] | None = None
+        self._buckets: dict[int, list[str]] = {}
+        self._encoded_buckets: dict[int, WordBucket] = {}
+        self._mmap: mmap.mmap | None = None
+
+        if self.is_compiled:
+            self._load_compiled()
+        else:
+            self._load_text()
+
+        if len(self.alphabet) > 256:
+            raise ValueError(f'Wordlist {wordlist_path} has more than 256 different characters.')
+
+        self.letter_codes: dict[str, int] = {letter: code for code, letter in enumerate(self.alphabet)}
+
+    def _load_text(self) -> None:
+        """
+        Reads a text wordlist.
+
+        :return: None
+        """
+
+        self._words = []
+        seen: set[str] = set()
+        for word in txt2list(self.wordlist_path):
             word = word.lower()
-            letter_counts.append(word.count(letter))
+            # Skip empty lines and duplicates (e.g. "Bank" and "bank")
+            if not word or word in seen:
+                continue
+
+            seen.add(word)
+            self._words.append(word)
+            self._buckets.setdefault(len(word), []).append(word)
+
+        # The alphabet starts with ALPHABET, followed by all other characters in the wordlist (e.g. é or ß)
+        extra_letters = set(''.join(self._words)) - set(ALPHABET)
+        self.alphabet: list[str] = ALPHABET + sorted(extra_letters)
+        self.bucket_sizes: dict[int, int] = {length: len(words) for length, words in self._buckets.items()}
+
+    def _load_compiled(self) -> None:
+        """
+        Memory-maps a compiled wordlist and reads its header. The buckets are only decoded when they are used.
+
+        :return: None
+        """
+
+        with open(self.wordlist_path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        _, version, alphabet_size, bucket_count = struct.unpack_from(WORDFILE_HEADER, self._mmap)
+        if version != WORDFILE_VERSION:
+            raise ValueError(f'Compiled wordlist {self.wordlist_path} has the unsupported version {version}.')
+
+        offset = struct.calcsize(WORDFILE_HEADER)
+        self.alphabet = list(self._mmap[offset:offset + alphabet_size].decode('utf-8'))
+        offset += alphabet_size
+
+        self.bucket_sizes = {}
+        for _ in range(bucket_count):
+            length, count, codes_offset, masks_offset = struct.unpack_from(WORDFILE_BUCKET, self._mmap, offset)
+            self.bucket_sizes[length] = count
+            self.layout[length] = (count, codes_offset, masks_offset)
+            offset += struct.calcsize(WORDFILE_BUCKET)
+
+    def __len__(self) -> int:
+        return sum(self.bucket_sizes.values())
+
+    @property
+    def words(self) -> list[str]:
+        if self._words is None:
+            self._words = [word for length in sorted(self.bucket_sizes) for word in self.get_bucket(length)]
+
+        return self._words
+
+    def get_bucket(self, length: int) -> list[str]:
+        """
+        Returns all words with the given length.
+
+        :param length: Length of the words.
+        :return: A list of words with the given length.
+        """
+
+        if self.is_compiled:
+            return self.get_encoded_bucket(length).words if length in self.bucket_sizes else []
+
+        return self._buckets.get(length, [])
+
+    def get_encoded_bucket(self, length: int) -> WordBucket:
+        """
+        Returns the encoded bucket of all words with the given length. Buckets are encoded on first use.
+
+        :param length: Length of the words.
+        :return: The encoded bucket.
+        """
+
+        if length not in self._encoded_buckets:
+            if length in self.layout:
+                count, codes_offset, masks_offset = self.layout[length]
+                stride = (len(self.alphabet) + 7) // 8
+                view = memoryview(self._mmap)
+                bucket = WordBucket(length, view[codes_offset:codes_offset + count * length], self.letter_codes,
+                                    self.backend, masks=view[masks_offset:masks_offset + count * stride])
+            else:
+                words = self._buckets.get(length, [])
+                code_table = str.maketrans({letter: chr(code) for letter, code in self.letter_codes.items()})
+                codes = ''.join(words).translate(code_table).encode('latin-1')
+                bucket = WordBucket(length, codes, self.letter_codes, self.backend, words=words)
+
+            self._encoded_buckets[length] = bucket
+
+        return self._encoded_buckets[length]
+
+
+def is_compiled_wordlist(wordlist_path: str) -> bool:
+    """
+    Checks if a file is a compiled wordlist.
+
+    :param wordlist_path: Path to the wordlist.
+    :return: True if the file starts with the magic bytes of a compiled wordlist.
+    """
+
+    with open(wordlist_path, 'rb') as file:
+        return file.read(len(WORDFILE_MAGIC)) == WORDFILE_MAGIC
+
+
+def write_compiled_wordlist(output_path: str,
+                            alphabet: list[str],
+                            buckets: Iterable[tuple[int, int, bytes | BinaryIO, bytes | BinaryIO]]) -> None:
+    """
+    Writes a compiled wordlist. The file is written to a temporary file first and then moved into place, so readers
+    never see a half-written wordlist.
+
+    Layout (little-endian): a header with the magic bytes, the version, the size of the alphabet and the number of
+    buckets, the alphabet as UTF-8, one table entry per bucket (word length, number of words, offset of the letter
+    codes, offset of the bitmasks), followed by the letter codes and bitmasks of all buckets.
+
+    :param output_path: Path of the compiled wordlist.
+    :param alphabet: The alphabet, the code of a letter is its index.
+    :param buckets: Word length, number of words, letter codes and bitmasks of each bucket. The letter codes and
+                    bitmasks can also be binary files, which are copied in chunks.
+    :return: None
+    """
+
+    def get_size(data: bytes | BinaryIO) -> int:
+        return len(data) if isinstance(data, (bytes, bytearray, memoryview)) else os.fstat(data.fileno()).st_size
+
+    def write_data(file: BinaryIO, data: bytes | BinaryIO) -> None:
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            file.write(data)
+        else:
+            data.seek(0)
+            shutil.copyfileobj(data, file)
+
+    buckets = list(buckets)
+    alphabet_bytes = ''.join(alphabet).encode('utf-8')
+    offset = struct.calcsize(WORDFILE_HEADER) + len(alphabet_bytes) + len(buckets) * struct.calcsize(WORDFILE_BUCKET)
+
+    table = b''
+    for length, count, codes, masks in buckets:
+        table += struct.pack(WORDFILE_BUCKET, length, count, offset, offset + get_size(codes))
+        offset += get_size(codes) + get_size(masks)
+
+    temp_path = output_path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(struct.pack(WORDFILE_HEADER, WORDFILE_MAGIC, WORDFILE_VERSION, len(alphabet_bytes), len(buckets)))
+        file.write(alphabet_bytes)
+        file.write(table)
+        for _, _, codes, masks in buckets:
+            write_data(file, codes)
+            write_data(file, masks)
+
+    os.replace(temp_path, output_path)
+
+
+def compile_wordlist(wordlist_path: str,
+                     output_path: str | None = None) -> str:
+    """
+    Compiles a text wordlist into the binary format that WordIndex memory-maps.
+
+    :param wordlist_path: Path to the text wordlist.
+    :param output_path: Path of the compiled wordlist, defaults to the wordlist path with the .bin extension.
+    :return: The path of the compiled wordlist.
+    """
+
+    if output_path is None:
+        output_path = get_compiled_path(wordlist_path)
+
+    index = WordIndex(wordlist_path)
+    buckets = []
+    for length in sorted(index.bucket_sizes):
+        bucket = index.get_encoded_bucket(length)
+        buckets.append((length, len(bucket), bytes(bucket.codes), bucket.get_mask_bytes()))
+
+    write_compiled_wordlist(output_path, index.alphabet, buckets)
+    return output_path
+
+
+def preprocess_wordlist(source_path: str,
+                        output_path: str | None = None,
+                        compiled_path: str | None = None,
+                        run_size: int | None = None) -> dict[int, int]:
+    """
+    Cleans a text wordlist and compiles it in one streaming pass with bounded memory.
+
+    The words are normalized, validated against ALPHABET and deduplicated (see dedupe_words). Each word is written to
+    the cleaned wordlist and its letter codes and bitmask to a temporary file of its length bucket, which are then
+    combined into the compiled wordlist. Both outputs are written to temporary files first and moved into place, so
+    the source can be cleaned in place and readers never see half-written files.
+
+    :param source_path: Path to the text wordlist.
+    :param output_path: Path of the cleaned wordlist, defaults to the source path.
+    :param compiled_path: Path of the compiled wordlist, defaults to the output path with the .bin extension.
+    :param run_size: Number of words per sorted run of the external sort. None deduplicates with a hash set.
+    :return: Number of words per word length.
+    """
+
+    if output_path is None:
+        output_path = source_path
+    if compiled_path is None:
+        compiled_path = get_compiled_path(output_path)
+
+    alphabet = ALPHABET
+    encode_table = str.maketrans({letter: chr(code) for code, letter in enumerate(alphabet)})
+    code_bits = {letter: 1 << code for code, letter in enumerate(alphabet)}
+    stride = (len(alphabet) + 7) // 8
+
+    words = dedupe_words(validate_words(normalize_words(read_lines(source_path)), alphabet), run_size)
+    bucket_sizes: dict[int, int] = {}
+    bucket_files: dict[int, tuple[BinaryIO, BinaryIO]] = {}
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    with tempfile.TemporaryDirectory(prefix='hangman_', dir=output_dir) as bucket_dir:
+        temp_path = output_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as output_file:
+                for word in words:
+                    output_file.write(word + '\n')
+
+                    length = len(word)
+                    if length not in bucket_files:
+                        bucket_files[length] = (open(os.path.join(bucket_dir, f'{length}.codes'), 'w+b'),
+                                                open(os.path.join(bucket_dir, f'{length}.masks'), 'w+b'))
+                        bucket_sizes[length] = 0
+
+                    codes_file, masks_file = bucket_files[length]
+                    codes_file.write(word.translate(encode_table).encode('latin-1'))
+                    masks_file.write(reduce(or_, map(code_bits.__getitem__, set(word)), 0).to_bytes(stride, 'little'))
+                    bucket_sizes[length] += 1
+
+            os.replace(temp_path, output_path)
+            for codes_file, masks_file in bucket_files.values():
+                codes_file.flush()
+                masks_file.flush()
+
+            write_compiled_wordlist(compiled_path, alphabet,
+                                    [(length, bucket_sizes[length], *bucket_files[length])
+                                     for length in sorted(bucket_sizes)])
+        finally:
+            for codes_file, masks_file in bucket_files.values():
+                codes_file.close()
+                masks_file.close()
+
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    return bucket_sizes
+
+
+def get_compiled_path(wordlist_path: str) -> str:
+    """
+    Returns the path of the compiled version of a text wordlist.
+
+    :param wordlist_path: Path to the text wordlist.
+    :return: The wordlist path with the .bin extension.
+    """
+
+    return os.path.splitext(wordlist_path)[0] + WORDFILE_EXTENSION
+
+
+def find_wordlist(wordlist_path: str) -> str:
+    """
+    Returns the compiled version of a text wordlist if it exists and is up to date, otherwise the wordlist itself.
+
+    :param wordlist_path: Path to the text wordlist.
+    :return: The path of the wordlist to load.
+    """
+
+    compiled_path = get_compiled_path(wordlist_path)
+    if compiled_path != wordlist_path and os.path.exists(compiled_path) \
+            and os.path.getmtime(compiled_path) >= os.path.getmtime(wordlist_path):
+        return compiled_path
+
+    return wordlist_path
+
+
+# Loaded word indexes, keyed by the absolute path of the wordlist and the backend
+_WORD_INDEXES: dict[tuple[str, str], WordIndex] = {}
+
+
+def load_word_index(wordlist: str | WordIndex,
+                    backend: str = 'python') -> WordIndex:
+    """
+    Returns the word index of a wordlist. Each wordlist is only read once per process and backend.
+
+    :param wordlist: The path to the wordlist or an already loaded word index.
+    :param backend: The backend of the index, 'python' or 'numpy'. Ignored if wordlist is already an index.
+    :return: The word index of the wordlist.
+    """
+
+    if isinstance(wordlist, WordIndex):
+        return wordlist
+
+    key = (os.path.abspath(wordlist), backend)
+    if key not in _WORD_INDEXES:
+        with timed('load_wordlist'):
+            _WORD_INDEXES[key] = WordIndex(wordlist, backend)
 
-        # Calculate the average count and add it with the letter to averages
-        letter_average = get_average(letter_counts)
-        averages.append([letter, letter_average])
+    return _WORD_INDEXES[key]
+
+
+def count_letters(d_words: Iterable[str],
+                  non_included_letters: Iterable[str] | None = None) -> tuple[dict[str, int], dict[str, int]]:
+    """
+    Counts, for every letter of the alphabet at once, in how many words it appears (document frequency) and how often
+    it appears in total. Each count is a single pass over the words instead of one pass per letter.
+
+    :param d_words: The words.
+    :param non_included_letters: Letters that shouldn't be included, e.g. the already guessed letters.
+    :return: The document frequency and the total occurrences of every included letter.
+    """
+
+    words = d_words if isinstance(d_words, list) else list(d_words)
+    # The distinct letters of every word, and all letters, joined into one string each
+    letter_sets = ''.join(map(''.join, map(set, words)))
+    letters = ''.join(words)
+
+    excluded = set(non_included_letters or [])
+    included = [letter for letter in ALPHABET if letter not in excluded]
+    return ({letter: letter_sets.count(letter) for letter in included},
+            {letter: letters.count(letter) for letter in included})
+
+
+# Currently unused
+def get_letter_averages(d_words: list[str],
+                        non_included_letters: list[str] | None = None) -> list[list[str | float]]:
+    """
+    Returns a list of letters with their average occurrence per word sorted by the occurrence.
+
+    :param d_words: A list of words to fo through.
+    :param non_included_letters: A list of letters that shouldn't be included.
+    :return:
+    """
+
+    words = [word.lower() for word in d_words]
+    occurrences = count_letters(words, non_included_letters)[1]
+    averages = [[letter, count / len(words) if words else 0.0] for letter, count in occurrences.items()]
 
     # Sort the "averages" list by the second item, from the largest count downwards
     averages.sort(key=lambda x: x[1], reverse=True)
@@ -150,40 +982,55 @@ def get_letter_averages(d_words: list[str]) -> list[list[str | float]]:
 def get_most_common_letters(d_words: list[str],
                             non_included_letters: list[str]) -> list[list[str, int]]:
     """
-    Returns a list of letters with their frequency sorted by the frequency.
+    Returns a list of letters with their frequency (the number of words they appear in) sorted by the frequency.
 
     :param d_words: A list of words to fo through.
     :param non_included_letters: A list of letters that shouldn't be included.
     :return:
     """
 
-    global ALPHABET
+    document_frequency = count_letters(d_words, non_included_letters)[0]
+    appearances = [[letter, count] for letter, count in document_frequency.items()]
 
-    if non_included_letters is None:
-        non_included_letters: list[str] = []
+    # Sort the "appearances" list by the second item, from the largest count downwards
+    appearances.sort(key=lambda x: x[1], reverse=True)
+    return appearances
 
-    appearances = []
-    # Cycle through the alphabet
-    for letter in ALPHABET:
-        if letter in non_included_letters:
-            continue
 
-        letter_appearance: int = 0
-        # Cycle through all words
-        for word in d_words:
-            if letter in word:
-                letter_appearance += 1
+def check_letters(d_wrong_guessed: list[str]) -> list[str]:
+    """
+    Checks that the wrong guessed letters are single letters.
 
-        appearances.append([letter, letter_appearance])
+    :param d_wrong_guessed: A list of all wrong guessed letters, empty entries are ignored.
+    :return: The wrong guessed letters without empty entries.
+    :raises ValueError: If an entry has more than one character.
+    """
 
-    # Sort the "averages" list by the second item, from the largest count downwards
-    appearances.sort(key=lambda x: x[1], reverse=True)
-    return appearances
+    for letter in d_wrong_guessed:
+        if len(letter) > 1:
+            raise ValueError(f'Wrong guessed letters have to be single letters, not {letter!r}.')
+
+    return [letter for letter in d_wrong_guessed if letter]
+
+
+def get_state_key(d_progress_word: str,
+                  d_wrong_guessed: list[str]) -> str:
+    """
+    Returns the canonical key of a game state.
+
+    :param d_progress_word: The word with the already guessed letters and underscores as not-guessed letters.
+    :param d_wrong_guessed: A list of all wrong guessed letters.
+    :return: The progress word and the sorted, deduplicated wrong guessed letters, separated by '|'.
+    :raises ValueError: If a wrong guessed letter has more than one character, since ['ab'] and ['a', 'b'] would
+                        share a key.
+    """
+
+    return d_progress_word + '|' + ''.join(sorted(set(check_letters(d_wrong_guessed))))
 
 
 def get_possible_words(d_progress_word: str,
                        d_wrong_guessed: list[str],
-                       wordlist_path: str) -> list[str]:
+                       wordlist: str | WordIndex) -> list[str]:
     """
     Returns a list of possible words left.
 
@@ -191,139 +1038,474 @@ def get_possible_words(d_progress_word: str,
     :type d_progress_word: Str
     :param d_wrong_guessed: A list of all wrong guessed letters.
     :type d_wrong_guessed: List[str]
-    :param wordlist_path: The path to the wordlist.
-    :type wordlist_path: Str
+    :param wordlist: The path to the wordlist or a loaded word index.
+    :type wordlist: Str | WordIndex
     :return: A list of possible words left.
     :rtype: List[str]
     """
 
-    words: list[str] = txt2list(wordlist_path)
     if d_wrong_guessed == ['']:
         d_wrong_guessed = []
 
-    # Get already guessed letters
-    progress_word_letters = list(set([char for char in d_progress_word if char != '_']))
-
-    possible_words: list[str] = []
-    # Cycle through the words:
-    for word in words:
-        word = word.lower()
-        # Exclude all words that can't be the solution word
-        if len(word) == len(d_progress_word):
-            if not any(letter in word for letter in d_wrong_guessed):
-                for idx in range(len(word)):
-                    if d_progress_word[idx] == '_':
-                        if word[idx] in progress_word_letters:
-                            break
-                    else:
-                        if word[idx] != d_progress_word[idx]:
-                            break
-                else:
-                    possible_words.append(word)
+    # Only words with the right length can be the solution word
+    bucket = load_word_index(wordlist).get_encoded_bucket(len(d_progress_word))
+    possible_words: list[str] = bucket.get_words(bucket.filter(d_progress_word, d_wrong_guessed))
 
     return possible_words
 
 
 def get_word_analysis_meth1(d_progress_word: str,
                             d_wrong_guessed: list[str],
-                            wordlist_path: str) -> tuple[list[str], list[list[str, int]]]:
+                            wordlist: str | WordIndex) -> tuple[list[str], list[list[str, int]]]:
     """
     Returns a list of possible words left and a list of letters with their frequency sorted by the frequency.
 
     :rtype: Object
     :param d_progress_word: The word with the already guessed letters and underscores as not-guessed letters.
     :param d_wrong_guessed: A list of all wrong guessed letters.
-    :param wordlist_path: The path to the wordlist.
+    :param wordlist: The path to the wordlist or a loaded word index.
     :return:
     """
 
-    if d_wrong_guessed == ['']:
-        d_wrong_guessed = []
+    return get_word_analysis(d_progress_word, d_wrong_guessed, wordlist, method=1)
 
-    progress_word_letters = list(set([char for char in d_progress_word if char != '_']))
-    possible_words = get_possible_words(d_progress_word, d_wrong_guessed, wordlist_path)
 
-    # Get the most common letters
-    most_common_letters = get_most_common_letters(possible_words, progress_word_letters + d_wrong_guessed)
-    return possible_words, most_common_letters
+class TurnContext:
+    """
+    Everything the strategies may need about the candidates of one turn. Every value is computed on first use and
+    then shared, so comparing several strategies on the same turn doesn't repeat any work.
+    """
+
+    def __init__(self, bucket: WordBucket,
+                 rows: 'list[int] | range | np.ndarray',
+                 non_included_letters: list[str],
+                 pool: 'AnalysisPool | None' = None) -> None:
+        """
+        :param bucket: The bucket of the candidates.
+        :param rows: Rows of the candidates in the bucket.
+        :param non_included_letters: A list of letters that shouldn't be ranked, e.g. the already guessed letters.
+        :param pool: Optional analysis pool of the same word index for the partitions of large candidate sets.
+        """
+
+        self.bucket = bucket
+        self.rows = rows
+        self.pool = pool
+        # The letters to rank
+        self.letters = [letter for letter in ALPHABET if letter not in non_included_letters]
+        self._partitions: dict[str, dict[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @cached_property
+    def candidates(self) -> list[str]:
+        return self.bucket.get_words(self.rows)
+
+    @cached_property
+    def letter_counts(self) -> dict[str, int]:
+        """
+        In how many candidates each letter appears.
+        """
+
+        counts = self.bucket.get_letter_counts(self.rows)
+        return {letter: counts[self.bucket.letter_codes[letter]] for letter in self.letters}
+
+    @cached_property
+    def position_counts(self) -> list[list[int]]:
+        """
+        How many candidates have each letter code at each position. The counts of a whole bucket are precomputed.
+        """
+
+        return self.bucket.get_position_counts(self.rows if len(self.rows) != len(self.bucket) else None)
+
+    def get_partitions(self, letters: list[str] | None = None) -> dict[str, dict[int, int]]:
+        """
+        Returns how many candidates each letter would reveal with each pattern (see WordBucket.get_partitions).
+        Letters that were already partitioned in this turn aren't partitioned again.
+
+        :param letters: The letters, defaults to all letters to rank.
+        :return: For each letter, the number of candidates per pattern.
+        """
+
+        letters = self.letters if letters is None else letters
+        missing = [letter for letter in letters if letter not in self._partitions]
+        if missing:
+            if self.pool is not None and len(self.rows) >= self.pool.min_candidates:
+                self._partitions.update(self.pool.get_partitions(self.bucket.length, self.rows, missing))
+            else:
+                self._partitions.update(self.bucket.get_partitions(self.rows, missing))
+
+        return {letter: self._partitions[letter] for letter in letters}
 
 
-def worker(args: tuple[str, list[str], list[str], str, list[str], str]) -> list[tuple[str, float | int]]:
+class Strategy:
     """
-    Worker function for multiprocessing.
+    A registered way of ranking the letters of a turn.
+    """
+
+    def __init__(self, name: str,
+                 rank: Callable[[TurnContext], list[list[str, int | float]]],
+                 label: str,
+                 method: int | None = None) -> None:
+        """
+        :param name: Name of the strategy.
+        :param rank: Returns the letters of a turn with their score, sorted from the best letter downwards.
+        :param label: Name of the score, e.g. for table headers.
+        :param method: Number of the strategy on the command line and in older code (e.g. 1 for the letter frequency).
+        """
+
+        self.name = name
+        self.rank = rank
+        self.label = label
+        self.method = method
+
+    def __call__(self, context: TurnContext) -> list[list[str, int | float]]:
+        return self.rank(context)
 
-    :param args: Args for the worker function.
-    :type args: Tuple[str, list[str], list[str], str, list[str], str]
-    :return: A list of tuples with the letter and the bits of information.
-    :rtype: List[tuple[str, float | int]]
+
+# Registered strategies, keyed by their name
+STRATEGIES: dict[str, Strategy] = {}
+
+
+def register_strategy(name: str,
+                      rank: Callable[[TurnContext], list[list[str, int | float]]],
+                      label: str,
+                      method: int | None = None) -> Strategy:
     """
+    Registers a strategy, so the bot, the command line and the benchmarks can select it by its name.
 
-    word, progress_word_letters, d_wrong_guessed, d_progress_word, possible_words, wordlist_path = args
-    information = []
-    for letter in ALPHABET:
-        if letter not in progress_word_letters + d_wrong_guessed:
-            if letter in word:
-                new_progress_word = get_new_progress_word(d_progress_word, letter, word)
-                num_new_possible_words = len(
-                    get_word_analysis_meth1(new_progress_word, d_wrong_guessed, wordlist_path)[0])
-                bits_of_information = math.log2(1 / (num_new_possible_words / len(possible_words)))
-            else:
-                bits_of_information = 0
+    :param name: Name of the strategy.
+    :param rank: Returns the letters of a turn with their score, sorted from the best letter downwards.
+    :param label: Name of the score.
+    :param method: Optional number of the strategy.
+    :return: The strategy.
+    """
 
-            information.append((letter, bits_of_information))
+    STRATEGIES[name] = Strategy(name, rank, label, method)
+    return STRATEGIES[name]
 
-    return information
 
+def get_strategy(strategy: str | int | Strategy) -> Strategy:
+    """
+    Returns a registered strategy.
 
-def get_word_analysis_meth2(d_progress_word: str,
-                            d_wrong_guessed: list[str],
-                            wordlist_path: str) -> tuple[list[str], list[list]]:
+    :param strategy: Name or number of the strategy.
+    :return: The strategy.
     """
-    Returns a list of possible words left and a list of letters with their average information sorted by the
-    information.
 
-    :param d_progress_word:
-    :type d_progress_word:
-    :param d_wrong_guessed:
-    :type d_wrong_guessed:
-    :param wordlist_path:
-    :type wordlist_path:
+    if isinstance(strategy, Strategy):
+        return strategy
+
+    for registered in STRATEGIES.values():
+        if strategy == registered.name or strategy == registered.method:
+            return registered
+
+    raise ValueError(f'Unknown strategy {strategy}. Choose one of {", ".join(STRATEGIES)}.')
+
+
+def rank_by_frequency(context: TurnContext) -> list[list[str, int]]:
+    """
+    Ranks the letters by the number of candidates they appear in (method 1).
+
+    :param context: The turn.
+    :return: The letters with their frequency, sorted by the frequency.
+    """
+
+    most_common_letters = [[letter, count] for letter, count in context.letter_counts.items()]
+    most_common_letters.sort(key=lambda x: x[1], reverse=True)
+    return most_common_letters
+
+
+def rank_by_information(context: TurnContext) -> list[list[str, float]]:
+    """
+    Ranks the letters by their information in bits (method 2), the entropy of the partition of the candidates by the
+    revealed pattern. Letters with the same information, e.g. all letters once only one candidate is left, are ranked
+    by the number of candidates they appear in, so certain hits come before certain misses.
+
+    :param context: The turn.
+    :return: The letters with their information, sorted by the information.
+    """
+
+    ranking = []
+    for letter, partition in context.get_partitions().items():
+        # The pattern 0 holds the candidates without the letter
+        hits = len(context) - partition.get(0, 0)
+        ranking.append((get_entropy(partition.values()), hits, letter))
+
+    ranking.sort(key=lambda x: x[:2], reverse=True)
+    return [[letter, information] for information, _, letter in ranking]
+
+
+def rank_by_position(context: TurnContext) -> list[list[str, float]]:
+    """
+    Ranks the letters by the number of candidates that contain them (like method 1, which keeps the misses low) plus a
+    bonus for how well a hit splits those candidates, estimated from the letter counts per position (method 3).
+
+    A hit leaves the words with the same reveal pattern, which is approximated by the words that have the letter at the
+    same position. So of two letters in equally many words, the one that is spread over more positions is preferred,
+    because its reveal narrows the candidates down further.
+
+    :param context: The turn.
+    :return: The letters with their score, sorted by the score.
+    """
+
+    position_counts = context.position_counts
+    scores = []
+    for letter, hits in context.letter_counts.items():
+        code = context.bucket.letter_codes[letter]
+        score = float(hits)
+        if hits:
+            # Expected number of words that are left after a hit
+            counts = [counts[code] for counts in position_counts]
+            hits_left = sum(count * count for count in counts) / sum(counts)
+            score += POSITION_WEIGHT * (hits - hits_left)
+
+        scores.append([letter, score])
+
+    scores.sort(key=lambda x: x[1], reverse=True)
+    return scores
+
+
+register_strategy('frequency', rank_by_frequency, 'Occurrence', 1)
+register_strategy('information', rank_by_information, 'Information in bits', 2)
+register_strategy('positional', rank_by_position, 'Positional score', 3)
+
+
+@instrument('scoring')
+def rank_candidates(bucket: WordBucket,
+                    rows: 'list[int] | range | np.ndarray',
+                    non_included_letters: list[str],
+                    method: str | int | Strategy = 1,
+                    pool: 'AnalysisPool | None' = None) -> list[list[str, int | float]]:
+    """
+    Returns the letters ranked by a strategy without decoding the candidates, for callers that only need the ranking.
+
+    :param bucket: The bucket of the candidates.
+    :param rows: Rows of the candidates in the bucket.
+    :param non_included_letters: A list of letters that shouldn't be included.
+    :param method: Name or number of a registered strategy.
+    :param pool: Optional analysis pool of the same word index for large candidate sets.
+    :return: The letters and their scores.
+    """
+
+    observe('candidates', len(rows))
+    return get_strategy(method)(TurnContext(bucket, rows, non_included_letters, pool))
+
+
+def analyze_candidates(bucket: WordBucket,
+                       rows: 'list[int] | range | np.ndarray',
+                       non_included_letters: list[str],
+                       method: str | int | Strategy = 1,
+                       pool: 'AnalysisPool | None' = None) -> tuple[list[str], list[list[str, int | float]]]:
+    """
+    Returns the candidate words of the given rows and the letters ranked by a strategy, e.g. with their frequency
+    (method 1), their information in bits (method 2) or their positional score (method 3).
+
+    :param bucket: The bucket of the candidates.
+    :param rows: Rows of the candidates in the bucket.
+    :param non_included_letters: A list of letters that shouldn't be included.
+    :param method: Name or number of a registered strategy.
+    :param pool: Optional analysis pool of the same word index for large candidate sets.
+    :return:
+    """
+
+    return bucket.get_words(rows), rank_candidates(bucket, rows, non_included_letters, method, pool)
+
+
+def get_word_analysis(d_progress_word: str,
+                      d_wrong_guessed: list[str],
+                      wordlist: str | WordIndex,
+                      method: str | int | Strategy = 1,
+                      pool: 'AnalysisPool | None' = None) -> tuple[list[str], list[list[str, int | float]]]:
+    """
+    Returns a list of possible words left and a list of letters ranked by any registered strategy.
+
+    :param d_progress_word: The word with the already guessed letters and underscores as not-guessed letters.
+    :param d_wrong_guessed: A list of all wrong guessed letters.
+    :param wordlist: The path to the wordlist or a loaded word index.
+    :param method: Name or number of a registered strategy.
+    :param pool: Optional analysis pool of the same word index for large candidate sets.
     :return:
-    :rtype:
     """
 
     if d_wrong_guessed == ['']:
         d_wrong_guessed = []
 
-    # Get already guessed letters
     progress_word_letters = list(set([char for char in d_progress_word if char != '_']))
+    bucket = load_word_index(wordlist).get_encoded_bucket(len(d_progress_word))
+    rows = bucket.filter(d_progress_word, d_wrong_guessed)
 
-    possible_words = get_possible_words(d_progress_word, d_wrong_guessed, wordlist_path)
+    return analyze_candidates(bucket, rows, progress_word_letters + d_wrong_guessed, method, pool)
 
-    # Use multiprocessing to speed up the computations
-    start_time = time.time()
-    information = []
-    with Pool(cpu_count()) as p:
-        results = p.map(worker,
-                        [(word, progress_word_letters, d_wrong_guessed, d_progress_word, possible_words, wordlist_path)
-                         for word in possible_words])
 
-    for worker_info in results:
-        information.extend(worker_info)
+def get_word_analysis_meth2(d_progress_word: str,
+                            d_wrong_guessed: list[str],
+                            wordlist: str | WordIndex,
+                            pool: 'AnalysisPool | None' = None) -> tuple[list[str], list[list[str, float]]]:
+    """
+    Returns a list of possible words left and a list of letters with their expected information in bits sorted by the
+    information.
 
-    # Get the letter with the highest average information
-    average_information = [[letter, get_average(list(info[1] for info in information if info[0] == letter))][0]
-                           for letter in set(letter for letter, _ in information)]
+    :param d_progress_word: The word with the already guessed letters and underscores as not-guessed letters.
+    :type d_progress_word: Str
+    :param d_wrong_guessed: A list of all wrong guessed letters.
+    :type d_wrong_guessed: List[str]
+    :param wordlist: The path to the wordlist or a loaded word index.
+    :type wordlist: Str | WordIndex
+    :param pool: Optional analysis pool of the same word index for large candidate sets.
+    :type pool: AnalysisPool | None
+    :return:
+    :rtype: Tuple[list[str], list[list[str, float]]]
+    """
 
-    print(average_information)
+    return get_word_analysis(d_progress_word, d_wrong_guessed, wordlist, method=2, pool=pool)
+
+
+class LazyWordList(Sequence):
+    """
+    The possible words of a state, which are only filtered when they are accessed. The length is known beforehand.
+    """
 
-    # Sort the "average_information" list by the second item, from the largest count downwards
-    average_information = [x for x in average_information if isinstance(x, list)]
-    average_information.sort(key=lambda x: x[1], reverse=True)
+    def __init__(self, wordlist: str | WordIndex,
+                 d_progress_word: str,
+                 d_wrong_guessed: list[str],
+                 count: int) -> None:
+        self.index = load_word_index(wordlist)
+        self.progress_word = d_progress_word
+        self.wrong_guessed = list(d_wrong_guessed)
+        self.count = count
+        self._words: list[str] | None = None
 
-    print(f"Time: {time.time() - start_time} seconds.")
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, item):
+        return self.words[item]
+
+    def __repr__(self) -> str:
+        return repr(self.words)
+
+    @property
+    def words(self) -> list[str]:
+        if self._words is None:
+            self._words = get_possible_words(self.progress_word, self.wrong_guessed, self.index)
+
+        return self._words
+
+
+class GameState:
+    """
+    The state of one game. Keeps the remaining candidates, so every guess only filters the survivors of the last one.
+    The candidates are only filtered when they are needed.
+    """
 
-    return possible_words, average_information
+    def __init__(self, wordlist: str | WordIndex,
+                 length: int) -> None:
+        self.index = load_word_index(wordlist)
+        self.bucket = self.index.get_encoded_bucket(length)
+        self.progress_word = '_' * length
+        self.wrong_guessed: list[str] = []
+        # Rows of the remaining candidates in the bucket, None while every word of the bucket is possible
+        self.rows: 'list[int] | np.ndarray | None' = None
+        # The state the rows were filtered for
+        self._filtered_state: tuple[str, set[str]] = (self.progress_word, set())
+
+    def __len__(self) -> int:
+        return len(self.candidate_rows)
+
+    @property
+    def candidate_rows(self) -> 'list[int] | range | np.ndarray':
+        if self._filtered_state != (self.progress_word, set(self.wrong_guessed)):
+            self.rows = self.bucket.filter(self.progress_word, self.wrong_guessed, self.rows)
+            self._filtered_state = (self.progress_word, set(self.wrong_guessed))
+
+        if self.rows is None:
+            return np.arange(len(self.bucket)) if self.bucket.backend == 'numpy' else range(len(self.bucket))
+
+        return self.rows
+
+    @property
+    def candidates(self) -> list[str]:
+        rows = self.candidate_rows
+        if self.rows is None:
+            return list(self.bucket.words)
+
+        return self.bucket.get_words(rows)
+
+    @property
+    def guessed_letters(self) -> list[str]:
+        return list(set(char for char in self.progress_word if char != '_')) + self.wrong_guessed
+
+    def apply_guess(self, letter: str,
+                    progress_word: str) -> None:
+        """
+        Applies a guess. If the progress word didn't change, the letter was a miss.
+
+        :param letter: The guessed letter.
+        :param progress_word: The progress word after the guess.
+        :return: None
+        """
+
+        wrong_guessed = self.wrong_guessed
+        if progress_word == self.progress_word and letter not in wrong_guessed:
+            wrong_guessed = wrong_guessed + [letter]
+
+        self.update(progress_word, wrong_guessed)
+
+    def update(self, d_progress_word: str,
+               d_wrong_guessed: list[str]) -> None:
+        """
+        Sets a new progress word and new wrong guessed letters. If the new state is a refinement of the current one,
+        only the remaining candidates will be filtered, otherwise the whole bucket will be filtered again.
+
+        :param d_progress_word: The word with the already guessed letters and underscores as not-guessed letters.
+        :param d_wrong_guessed: A list of all wrong guessed letters.
+        :return: None
+        """
+
+        if d_wrong_guessed == ['']:
+            d_wrong_guessed = []
+
+        if len(d_progress_word) != len(self.progress_word):
+            self.bucket = self.index.get_encoded_bucket(len(d_progress_word))
+            self.rows = None
+            self._filtered_state = ('_' * len(d_progress_word), set())
+        elif not self.is_refinement(d_progress_word, d_wrong_guessed):
+            self.rows = None
+            self._filtered_state = ('_' * len(d_progress_word), set())
+
+        self.progress_word = d_progress_word
+        self.wrong_guessed = list(d_wrong_guessed)
+
+    def is_refinement(self, d_progress_word: str,
+                      d_wrong_guessed: list[str]) -> bool:
+        """
+        Checks if a state can only be reached from the current state by further guesses.
+
+        :param d_progress_word: The word with the already guessed letters and underscores as not-guessed letters.
+        :param d_wrong_guessed: A list of all wrong guessed letters.
+        :return: True if every candidate of the new state is also a candidate of the current state.
+        """
+
+        if not set(self.wrong_guessed).issubset(d_wrong_guessed):
+            return False
+
+        # A letter that was already guessed can't be revealed at another position by a further guess
+        guessed_letters = set(self.progress_word) | set(self.wrong_guessed)
+        return all(old == new or (old == '_' and new not in guessed_letters)
+                   for old, new in zip(self.progress_word, d_progress_word))
+
+    def analyze(self, method: str | int | Strategy = 1,
+                pool: 'AnalysisPool | None' = None) -> tuple[list[str], list[list[str, int | float]]]:
+        """
+        Returns a list of possible words left and a list of letters ranked by a registered strategy.
+
+        :param method: Name or number of a registered strategy.
+        :param pool: Optional analysis pool of the same word index for large candidate sets.
+        :return:
+        """
+
+        return analyze_candidates(self.bucket, self.candidate_rows, self.guessed_letters, method, pool)
 
 
 if __name__ == '__main__':